@@ -0,0 +1,58 @@
+from fastapi import APIRouter
+
+from app.core.appwrite_client import registry as appwrite_registry
+from app.core.dtech_client import get_dtech_client
+from app.core.logs import pipeline as log_pipeline
+from app.services.idempotency import idempotency
+from app.services.persistence import persistence
+from app.services.process_index import process_index
+from app.services.status_cache import status_cache
+from app.services.upload_progress import upload_tracker
+from app.utils.background import notifier
+
+router = APIRouter()
+
+@router.get("/status-cache", response_model=None)
+async def status_cache_metrics():
+    """Hit ratio and coalescing counters for the DTech status cache"""
+    return status_cache.stats()
+
+@router.get("/notifications", response_model=None)
+async def notification_metrics():
+    """Queue depth and delivery counters for notification digests"""
+    return notifier.stats()
+
+@router.get("/appwrite", response_model=None)
+async def appwrite_metrics():
+    """Cached Appwrite health and how often a real probe was issued"""
+    return appwrite_registry.stats()
+
+@router.get("/dtech", response_model=None)
+async def dtech_metrics():
+    """Circuit breaker state and retry counts for DTech upstream calls"""
+    return get_dtech_client().stats()
+
+@router.get("/idempotency", response_model=None)
+async def idempotency_metrics():
+    """How many /start requests were executed, replayed or coalesced"""
+    return idempotency.stats()
+
+@router.get("/uploads", response_model=None)
+async def upload_metrics():
+    """Open upload event streams and how many states were pushed or dropped"""
+    return upload_tracker.stats()
+
+@router.get("/logging", response_model=None)
+async def logging_metrics():
+    """Log queue depth and records dropped when full or sampled out"""
+    return log_pipeline.stats()
+
+@router.get("/persistence", response_model=None)
+async def persistence_metrics():
+    """Write-behind queue and journal depth, and records written, spilled or replayed"""
+    return persistence.stats()
+
+@router.get("/process-index", response_model=None)
+async def process_index_metrics():
+    """Read model backend, writes and how many entries listings examined"""
+    return process_index.stats()
@@ -1,28 +1,41 @@
-from fastapi import APIRouter, Request, Form, BackgroundTasks, HTTPException, Depends, Cookie
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, Form, BackgroundTasks, HTTPException, Depends, Cookie, Header, Query
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from email_validator import validate_email, EmailNotValidError
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from contextlib import aclosing
+import asyncio
 import uuid
 import json
 
-from app.core.appwrite_client import get_account
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from app.core.appwrite_async import appwrite
+from app.core.responses import ORJSONResponse, dumps
+from app.core.templates import templates
 from app.schemas.sales import (
     StartSalesRequest, BaseRequest, User, RecordingUploadResponse,
-    RecordingUploadRequest
+    RecordingUploadRequest, BatchStatusRequest, StatusQuery,
+    ContinueProcessResponse, ProcessStatusResponse, StopProcessResponse,
+    UploadStatusUpdate, ProcessListResponse
 )
 from app.services.dtech_service import (
-    create_process, continue_process, get_status,
+    create_process, continue_process,
     stop_process as dtech_stop_process, get_recording_url
 )
-from app.utils.background import run_background_tasks
+from app.services.idempotency import IdempotencyError, idempotency, start_request_key
+from app.services.persistence import record_process_started, record_process_status, record_recording
+from app.services.process_index import InvalidCursor, ProcessQuery, process_index
+from app.services.status_cache import status_cache
+from app.services.upload_progress import UploadFinished, UploadNotFound, upload_tracker
+from app.utils.background import notify, run_background_tasks
 from app.utils.session import session_manager
 from app.utils.aws_exceptions import handle_dtech_error
+from config.settings import settings
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 async def get_current_user(session_id: str = Cookie(None)) -> Optional[dict]:
@@ -43,11 +56,11 @@ async def login(
     password: str = Form(...)
 ):
     try:
-        # Validate email
-        validate_email(email)
+        # Validate email (deliverability check does a blocking DNS lookup)
+        await asyncio.to_thread(validate_email, email)
         
         # Authenticate with Appwrite
-        session = get_account().create_email_password_session(email=email, password=password)
+        session = await appwrite.create_email_password_session(email=email, password=password)
         
         if not session or not isinstance(session, dict) or "$id" not in session:
             return HTMLResponse(
@@ -87,6 +100,11 @@ async def login(
             content=f"<div class='error-message'><i class='fas fa-exclamation-circle'></i> Invalid email format</div>",
             status_code=400
         )
+    except asyncio.TimeoutError:
+        return HTMLResponse(
+            content=f"<div class='error-message'><i class='fas fa-exclamation-circle'></i> Login service is busy, please try again</div>",
+            status_code=503
+        )
     except Exception as e:
         return HTMLResponse(
             content=f"<div class='error-message'><i class='fas fa-exclamation-circle'></i> Login failed: {str(e)}</div>",
@@ -102,43 +120,254 @@ async def logout(session_id: str = Cookie(None)):
     response.delete_cookie("session_id")
     return response
 
+async def _create_process_json(item: StartSalesRequest) -> dict:
+    """create_process as plain JSON data, the form idempotency results are stored in"""
+    result = await create_process(item.user, item.lead)
+    record_process_started(result.sales_process_id, item.user, item.lead)
+    # DTech files every process under the configured account, whatever the caller sent
+    await process_index.record_started(
+        result.sales_process_id, settings.DIFFERENT_ACCOUNT_ID, item.user.external_id, item.lead.campaign_code
+    )
+    return result.model_dump(mode="json")
+
 @router.post("/start", response_model=None)
-async def start_sales(request: StartSalesRequest, background_tasks: BackgroundTasks):
+async def start_sales(
+    request: StartSalesRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Start a sales process; duplicates replay the first result instead of calling DTech"""
+    key, fingerprint, ttl = start_request_key(request, idempotency_key)
     try:
-        result = await create_process(request.user, request.lead)
-        run_background_tasks(background_tasks, {"event": "start_process", "result": result})
-        return JSONResponse(content=result)
+        result, replayed = await idempotency.run(
+            key, fingerprint, ttl, lambda: _create_process_json(request)
+        )
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise handle_dtech_error(e)
+    if replayed:
+        return ORJSONResponse(content=result, headers={"Idempotent-Replayed": "true"})
+    run_background_tasks(background_tasks, {"event": "start_process", "result": result})
+    return ORJSONResponse(content=result)
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that never listens for disconnects.
+
+    The stock response reads ``receive`` concurrently to spot a client
+    going away, which would swallow request body chunks the endpoint is
+    still consuming. A vanished client surfaces as an error on send or on
+    the next body read instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def _ndjson_lines(request: Request, max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Yield (line_number, line) from a streamed body; line is None if it was too long"""
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in request.stream():
+        buffer += chunk
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                break
+            line, buffer = buffer[:end], buffer[end + 1:]
+            line_no += 1
+            if skipping:
+                skipping = False
+                continue
+            if len(line) > max_line_bytes:
+                yield line_no, None
+            elif line.strip():
+                yield line_no, line
+        if len(buffer) > max_line_bytes and not skipping:
+            # Report the line now and drop the rest of it as it arrives
+            yield line_no + 1, None
+            skipping = True
+        if skipping:
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield line_no + 1, buffer
+
+async def _bulk_start_lines(request: Request) -> AsyncIterator[bytes]:
+    """Create a sales process per NDJSON line; yield results in completion order.
+
+    A permit is taken before each line is read and only returned once its
+    result has been written out, so in-flight creates plus unsent results
+    never exceed BULK_START_CONCURRENCY and memory stays flat however large
+    the upload is. Slow clients slow down reading, not the other way round.
+    """
+    permits = asyncio.Semaphore(settings.BULK_START_CONCURRENCY)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+    done = object()
+
+    async def create(line_no: int, item: StartSalesRequest) -> None:
+        line = {"line": line_no}
+        try:
+            key, fingerprint, ttl = start_request_key(item, None)
+            line["result"], line["replayed"] = await idempotency.run(
+                key, fingerprint, ttl, lambda: _create_process_json(item)
+            )
+            if not line["replayed"]:
+                await notify({"event": "start_process", "result": line["result"]})
+        except IdempotencyError as e:
+            line["error"] = {"status_code": e.status_code, "detail": str(e)}
+        except Exception as e:
+            error = handle_dtech_error(e)
+            line["error"] = {"status_code": error.status_code, "detail": error.detail}
+        results.put_nowait(line)
+
+    async def produce() -> None:
+        try:
+            async for line_no, raw in _ndjson_lines(request, settings.BULK_START_MAX_LINE_BYTES):
+                await permits.acquire()
+                if raw is None:
+                    results.put_nowait({"line": line_no, "error": {
+                        "status_code": 413,
+                        "detail": f"Line exceeds {settings.BULK_START_MAX_LINE_BYTES} bytes"
+                    }})
+                    continue
+                try:
+                    item = StartSalesRequest.model_validate_json(raw)
+                except ValidationError as e:
+                    results.put_nowait({"line": line_no, "error": {
+                        "status_code": 422,
+                        "detail": json.loads(e.json(include_url=False))
+                    }})
+                    continue
+                task = asyncio.create_task(create(line_no, item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(list(tasks))
+        except Exception as e:
+            results.put_nowait({"error": {"status_code": 400, "detail": f"Could not read request body: {e}"}})
+        results.put_nowait(done)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            line = await results.get()
+            if line is done:
+                break
+            yield dumps(line) + b"\n"
+            permits.release()
+    finally:
+        # Client went away: stop reading and don't leave creates running
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
 
-@router.post("/continue/{spid}", response_model=None)
+@router.post("/start/bulk", response_model=None)
+async def start_sales_bulk(request: Request):
+    """Start one sales process per NDJSON StartSalesRequest line, streaming NDJSON results"""
+    return _DuplexStreamingResponse(_bulk_start_lines(request), media_type="application/x-ndjson")
+
+@router.post("/continue/{spid}", response_model=ContinueProcessResponse)
 async def continue_sales(spid: str, request: BaseRequest, user: User, background_tasks: BackgroundTasks):
     try:
         result = await continue_process(spid, user)
-        run_background_tasks(background_tasks, {"event": "continue_process", "result": result})
-        # Format response according to spec
-        return {
-            "url": result["url"],
-            "url_expiry": result["url_expiry"]
-        }
+        record_process_status(spid, "continued")
+        await process_index.record_status(spid, "continued")
+        run_background_tasks(
+            background_tasks, {"event": "continue_process", "result": result.model_dump(mode="json")}
+        )
+        return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise handle_dtech_error(e)
 
-@router.get("/status/{spid}/{accountid}", response_model=None)
+@router.get("/status/{spid}/{accountid}", response_model=ProcessStatusResponse)
 async def get_process_status(spid: str, accountid: str):
     try:
-        result = await get_status(spid, accountid)
+        result = await status_cache.get(spid, accountid)
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise handle_dtech_error(e)
+
+async def _batch_status_lines(items: List[StatusQuery]) -> AsyncIterator[bytes]:
+    """Yield one NDJSON line per item, in completion order"""
+    semaphore = asyncio.Semaphore(settings.STATUS_BATCH_CONCURRENCY)
+
+    async def fetch(item: StatusQuery) -> dict:
+        line = {"spid": item.spid, "account_id": item.account_id}
+        async with semaphore:
+            try:
+                line["result"] = await asyncio.wait_for(
+                    status_cache.get(item.spid, item.account_id),
+                    timeout=settings.STATUS_BATCH_ITEM_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                line["error"] = {"status_code": 504, "detail": "Timed out waiting for DTech"}
+            except Exception as e:
+                error = handle_dtech_error(e)
+                line["error"] = {"status_code": error.status_code, "detail": error.detail}
+        return line
+
+    tasks = [asyncio.create_task(fetch(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield dumps(await next_done) + b"\n"
+    finally:
+        # Client went away: don't leave fetches running for nobody
+        for task in tasks:
+            task.cancel()
+
+@router.post("/status/batch", response_model=None)
+async def get_batch_status(request: BatchStatusRequest):
+    """Stream the status of many sales processes as NDJSON as each completes"""
+    if len(request.items) > settings.STATUS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.STATUS_BATCH_MAX_ITEMS} items per batch"
+        )
+    return StreamingResponse(
+        _batch_status_lines(request.items),
+        media_type="application/x-ndjson"
+    )
 
-@router.post("/stop/{spid}", response_model=None)
+@router.get("/processes", response_model=ProcessListResponse)
+async def list_processes(
+    agent_id: Optional[str] = None,
+    campaign_code: Optional[str] = None,
+    status: List[str] = Query([]),
+    account_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=settings.PROCESS_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None
+):
+    """List processes started through this service, newest first, from the local read model"""
+    query = ProcessQuery(
+        agent_id=agent_id,
+        campaign_code=campaign_code,
+        statuses=status,
+        account_id=account_id,
+        created_after=created_after.timestamp() if created_after else None,
+        created_before=created_before.timestamp() if created_before else None
+    )
+    try:
+        items, next_cursor = await process_index.query(query, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Process index is unavailable")
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.post("/stop/{spid}", response_model=StopProcessResponse)
 async def stop_process(spid: str, request: BaseRequest, reason: str):
     try:
         result = await dtech_stop_process(spid, request.account_id, reason)
+        record_process_status(spid, result.status or "stopped")
+        await process_index.record_status(spid, result.status or "stopped")
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise handle_dtech_error(e)
 
 @router.post("/recording-url/{spid}", response_model=RecordingUploadResponse)
 async def get_recording_upload_url(
@@ -153,20 +382,7 @@ async def get_recording_upload_url(
     try:
         # Generate upload ID for tracking
         upload_id = str(uuid.uuid4())
-        
-        # Store upload metadata in session
-        upload_metadata = {
-            "upload_id": upload_id,
-            "filename": request.filename,
-            "started_at": datetime.now().isoformat(),
-            "status": "pending"
-        }
-        
-        await session_manager.set_session(
-            f"upload:{upload_id}",
-            upload_metadata,
-            expiry=timedelta(hours=1)
-        )
+        started_at = datetime.now().isoformat()
         
         result = await get_recording_url(
             spid=spid,
@@ -178,13 +394,16 @@ async def get_recording_upload_url(
             content_type=request.content_type,
             external_ref=request.external_ref
         )
+        record_recording(result["recording_id"], spid, request.filename, request.date_start)
         
-        # Update upload status
-        upload_metadata["status"] = "url_generated"
-        await session_manager.set_session(
-            f"upload:{upload_id}",
-            upload_metadata,
-            expiry=timedelta(hours=1)
+        # The upload ID is only handed out with this response, so nobody can
+        # observe a "pending" record; store the first state in one write.
+        await upload_tracker.create(
+            upload_id,
+            filename=request.filename,
+            started_at=started_at,
+            status="url_generated",
+            progress=0.0
         )
         
         return RecordingUploadResponse(
@@ -194,7 +413,7 @@ async def get_recording_upload_url(
         
     except Exception as e:
         error = handle_dtech_error(e)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=error.status_code,
             content={"detail": error.detail}
         )
@@ -204,19 +423,60 @@ async def get_upload_status(
     upload_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get the status of an ongoing upload"""
+    """Get the current status of an upload (see /upload-events for push updates)"""
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+        
+    upload_data = await upload_tracker.get(upload_id)
+    if not upload_data:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload_data
+
+@router.post("/upload-status/{upload_id}", response_model=None)
+async def report_upload_status(
+    upload_id: str,
+    update: UploadStatusUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Record upload progress reported by the uploader and push it to watchers"""
     if not current_user:
         raise HTTPException(status_code=401, detail="Not authenticated")
         
     try:
-        upload_data = await session_manager.get_session(f"upload:{upload_id}")
-        if not upload_data:
-            raise HTTPException(status_code=404, detail="Upload not found")
-            
-        return JSONResponse(content=upload_data)
-    except Exception as e:
-        error = handle_dtech_error(e)
-        return JSONResponse(
-            status_code=error.status_code,
-            content={"detail": error.detail}
+        return await upload_tracker.update(
+            upload_id,
+            status=update.status,
+            progress=1.0 if update.status == "completed" else update.progress,
+            error=update.error
         )
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadFinished:
+        raise HTTPException(status_code=409, detail="Upload already finished")
+
+async def _upload_events(upload_id: str) -> AsyncIterator[bytes]:
+    """Server-sent events: one ``status`` event per transition"""
+    async with aclosing(upload_tracker.watch(upload_id)) as states:
+        async for state in states:
+            if state is None:
+                yield b": keepalive\n\n"
+            else:
+                yield b"event: status\ndata: " + dumps(state) + b"\n\n"
+
+@router.get("/upload-events/{upload_id}", response_model=None)
+async def stream_upload_events(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Push status transitions of an upload as server-sent events until it finishes"""
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+        
+    if not await upload_tracker.get(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return StreamingResponse(
+        _upload_events(upload_id),
+        media_type="text/event-stream",
+        # Proxies must not buffer or cache the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
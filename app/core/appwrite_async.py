@@ -0,0 +1,69 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.appwrite_client import get_account
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncAppwrite:
+    """Run blocking Appwrite SDK calls off the event loop.
+
+    Calls execute on a dedicated, bounded thread pool so a burst of logins
+    can neither stall the loop nor exhaust Starlette's shared threadpool.
+    ``max_concurrency`` caps calls admitted at once (waiting ones queue on
+    a semaphore) and ``timeout`` bounds the total wait per call. A timed-out
+    call keeps its worker thread until the SDK returns, because threads
+    cannot be interrupted.
+    """
+
+    def __init__(self, max_workers: int = 16, max_concurrency: int = 64, timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.timeouts = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="appwrite"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call ``fn(*args, **kwargs)`` on the Appwrite pool"""
+        loop = asyncio.get_running_loop()
+
+        async def call() -> T:
+            async with self._semaphore:
+                return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+        try:
+            return await asyncio.wait_for(call(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning("Appwrite call %s timed out after %ss", getattr(fn, "__name__", fn), self.timeout)
+            raise
+
+    async def create_email_password_session(self, email: str, password: str) -> dict:
+        return await self.run(get_account().create_email_password_session, email=email, password=password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+appwrite = AsyncAppwrite(
+    max_workers=settings.APPWRITE_MAX_WORKERS,
+    max_concurrency=settings.APPWRITE_MAX_CONCURRENCY,
+    timeout=settings.APPWRITE_TIMEOUT,
+)
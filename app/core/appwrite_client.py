@@ -1,4 +1,12 @@
+import http.cookiejar
 import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+import appwrite.client as appwrite_client_module
 from appwrite.client import Client
 from appwrite.services.account import Account
 from appwrite.services.databases import Databases
@@ -15,6 +23,8 @@ from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+ServiceT = TypeVar("ServiceT")
+
 def validate_url(url: str, name: str) -> None:
     """Validate that a URL is properly formatted"""
     try:
@@ -24,71 +34,214 @@ def validate_url(url: str, name: str) -> None:
     except Exception as e:
         raise ValueError(f"Error parsing {name} URL: {str(e)}")
 
+class _BlockAllCookies(http.cookiejar.CookiePolicy):
+    """Never store or send cookies; registry clients authenticate with the API key"""
+
+    return_ok = set_ok = domain_return_ok = path_return_ok = lambda self, *args, **kwargs: False
+    netscape = True
+    rfc2965 = hide_cookie2 = False
+
+class _SessionRouter:
+    """Stand-in for the ``requests`` module used inside appwrite.client.
+
+    The SDK calls ``requests.request(...)`` on the module directly, so this
+    is the only place a Session can be slotted in. Only calls made through
+    a _PooledClient use one, the Session that client bound for the calling
+    thread; every other call goes to ``requests`` as before. Written
+    against ``Client.call`` in appwrite 6.1.0, which requirements.txt pins;
+    check it still calls ``requests.request`` before upgrading the SDK.
+    """
+
+    def __init__(self):
+        self.bound = threading.local()
+
+    def request(self, *args, **kwargs):
+        session = getattr(self.bound, "session", None)
+        return (session or requests).request(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(requests, name)
+
+_router = _SessionRouter()
+# Installed once, at import; the router is inert for calls no client bound
+appwrite_client_module.requests = _router
+
+class _PooledClient(Client):
+    """Appwrite client whose calls reuse a keep-alive Session per thread"""
+
+    def __init__(self, session_factory):
+        super().__init__()
+        self._session_factory = session_factory
+
+    def call(self, *args, **kwargs):
+        _router.bound.session = self._session_factory()
+        try:
+            return super().call(*args, **kwargs)
+        finally:
+            _router.bound.session = None
+
+class AppwriteRegistry:
+    """Process-wide cache of Appwrite clients, services and health.
+
+    Each configured client is built once and its services are reused.
+    Connectivity is checked with a real ``databases.list()`` probe at most
+    once per ``health_interval`` seconds; callers in between get the cached
+    result.
+    """
+
+    def __init__(self, health_interval: float = 30.0, pool_size: int = 20):
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        # Separate from _lock: the probe builds the client, and must not
+        # hold up client construction while it waits on the network
+        self._probe_lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str, str], Client] = {}
+        self._services: Dict[Tuple[Tuple[str, str, str], type], Any] = {}
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._healthy: Optional[bool] = None
+        self._health_error: Optional[Exception] = None
+        self._health_checked_at = 0.0
+        self.health_probes = 0
+        self.health_checks = 0
+
+    def _session(self) -> requests.Session:
+        """This thread's Session; sessions are never shared between threads"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(_BlockAllCookies())
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+        return session
+
+    @staticmethod
+    def _config() -> Tuple[str, str, str]:
+        return (
+            settings.APPWRITE_ENDPOINT.strip('"# '),  # Remove quotes and comments
+            settings.APPWRITE_PROJECT_ID.strip('"# '),
+            settings.APPWRITE_API_KEY.strip('"# '),
+        )
+
+    def client(self) -> Client:
+        config = self._config()
+        client = self._clients.get(config)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(config)
+            if client is None:
+                endpoint, project_id, api_key = config
+                # Log configuration (without sensitive data)
+                logger.debug("Initializing Appwrite client with endpoint: %s", endpoint)
+                logger.debug("Using project ID: %s", project_id)
+
+                # Create and configure the client
+                client = _PooledClient(self._session)
+                client.set_endpoint(endpoint)
+                client.set_project(project_id)
+                client.set_key(api_key)
+                self._clients[config] = client
+        return client
+
+    def service(self, service_cls: Type[ServiceT]) -> ServiceT:
+        key = (self._config(), service_cls)
+        service = self._services.get(key)
+        if service is None:
+            service = service_cls(self.client())
+            self._services[key] = service
+        return service
+
+    def check_health(self, force: bool = False) -> bool:
+        """Return cached connectivity, probing Appwrite when the cache is stale"""
+        self.health_checks += 1
+        if not force and time.monotonic() - self._health_checked_at < self.health_interval:
+            return bool(self._healthy)
+        client = self.client()
+        with self._probe_lock:
+            if not force and time.monotonic() - self._health_checked_at < self.health_interval:
+                return bool(self._healthy)
+            self.health_probes += 1
+            try:
+                Databases(client).list()
+                self._healthy, self._health_error = True, None
+            except Exception as e:
+                logger.error("Appwrite health probe failed: %s", e)
+                self._healthy, self._health_error = False, e
+            self._health_checked_at = time.monotonic()
+        return self._healthy
+
+    def ensure_healthy(self) -> None:
+        """Raise the last probe error if Appwrite is known to be unreachable"""
+        if not self.check_health() and self._health_error is not None:
+            raise self._health_error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "services": len(self._services),
+            "healthy": self._healthy,
+            "last_error": str(self._health_error) if self._health_error else None,
+            "seconds_since_probe": (
+                time.monotonic() - self._health_checked_at if self._health_checked_at else None
+            ),
+            "health_checks": self.health_checks,
+            "health_probes": self.health_probes,
+        }
+
+registry = AppwriteRegistry(
+    health_interval=settings.APPWRITE_HEALTH_INTERVAL,
+    pool_size=settings.APPWRITE_POOL_SIZE,
+)
+
 def get_appwrite_client() -> Client:
-    """Get a configured and validated Appwrite client"""
+    """Get the shared, configured Appwrite client"""
     try:
-        endpoint = settings.APPWRITE_ENDPOINT.strip('"# ')  # Remove quotes and comments
-        project_id = settings.APPWRITE_PROJECT_ID.strip('"# ')
-        api_key = settings.APPWRITE_API_KEY.strip('"# ')
-        
-        # Log configuration (without sensitive data)
-        logger.debug(f"Initializing Appwrite client with endpoint: {endpoint}")
-        logger.debug(f"Using project ID: {project_id}")
-        
-        # Create and configure the client
-        client = Client()
-        client.set_endpoint(endpoint)
-        client.set_project(project_id)
-        client.set_key(api_key)
-        
-        return client
-        
+        return registry.client()
     except AppwriteException as e:
-        logger.error(f"Appwrite client error: {str(e)}")
+        logger.error("Appwrite client error: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Error initializing Appwrite client: {str(e)}")
+        logger.error("Error initializing Appwrite client: %s", e)
         raise
 
 def get_account() -> Account:
-    return Account(get_appwrite_client())
+    return registry.service(Account)
 
 def get_database() -> Databases:
-    """Get a configured Appwrite Databases client with error handling"""
+    """Get the shared Appwrite Databases client, failing fast if Appwrite is down"""
     try:
-        client = get_appwrite_client()
-        databases = Databases(client)
-        
-        # Test the database connection
-        databases.list()  # This will throw if connection fails
-        return databases
+        registry.ensure_healthy()
+        return registry.service(Databases)
     except AppwriteException as e:
-        logger.error(f"Failed to connect to Appwrite database: {str(e)}")
+        logger.error("Failed to connect to Appwrite database: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error connecting to database: {str(e)}")
+        logger.error("Unexpected error connecting to database: %s", e)
         raise
 
 def get_storage():
-    return Storage(get_appwrite_client())
+    return registry.service(Storage)
 
 def get_teams():
-    return Teams(get_appwrite_client())
+    return registry.service(Teams)
 
 def get_users():
-    return Users(get_appwrite_client())
+    return registry.service(Users)
 
 def get_functions():
-    return Functions(get_appwrite_client())
+    return registry.service(Functions)
 
 def get_locale():
-    return Locale(get_appwrite_client())
+    return registry.service(Locale)
 
 def get_health():
-    return Health(get_appwrite_client())
+    return registry.service(Health)
 
 def get_avatars():
-    return Avatars(get_appwrite_client())
+    return registry.service(Avatars)
 
 def get_buckets():
-    return Storage(get_appwrite_client())
\ No newline at end of file
+    return registry.service(Storage)
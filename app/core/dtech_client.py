@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.metrics import DTECH_REQUEST_DURATION, DTECH_REQUESTS, registry
+from app.core.rate_limit import RATE_LIMIT_WAIT, Limit, OutboundLimiter, parse_limits
+from app.core.resilience import CircuitBreaker, RetryPolicy, parse_retry_after
+from app.utils.session import session_manager
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Operations that talk to the DTech gateway. Uploads go to the presigned
+# storage URL and get their own (much longer) write/read budget.
+UPLOAD_OPERATION = "upload_recording"
+
+# Transport errors raised before any byte of the request reached DTech;
+# retrying these cannot duplicate work upstream.
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def build_limits() -> httpx.Limits:
+    """Keep-alive pool limits for the DTech client"""
+    return httpx.Limits(
+        max_connections=settings.DTECH_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.DTECH_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.DTECH_KEEPALIVE_EXPIRY,
+    )
+
+
+def build_timeouts() -> Dict[str, httpx.Timeout]:
+    """Per-operation timeouts; anything not listed uses the default"""
+    default = httpx.Timeout(
+        settings.DTECH_TIMEOUT,
+        connect=settings.DTECH_CONNECT_TIMEOUT,
+        pool=settings.DTECH_POOL_TIMEOUT,
+    )
+    return {
+        "default": default,
+        "get_status": httpx.Timeout(
+            settings.DTECH_STATUS_TIMEOUT,
+            connect=settings.DTECH_CONNECT_TIMEOUT,
+            pool=settings.DTECH_POOL_TIMEOUT,
+        ),
+        UPLOAD_OPERATION: httpx.Timeout(
+            settings.DTECH_UPLOAD_TIMEOUT,
+            connect=settings.DTECH_CONNECT_TIMEOUT,
+            pool=settings.DTECH_POOL_TIMEOUT,
+        ),
+    }
+
+
+def build_retry_policies() -> Dict[str, RetryPolicy]:
+    """Per-operation retry policies; anything not listed uses the default.
+
+    Status reads are idempotent and retry on 5xx, throttling and any
+    transport error. Everything else (notably /ext/start) only retries when
+    DTech provably did not process the request: a 429, or a failure to
+    connect. Streamed uploads cannot be replayed and never retry.
+    """
+    idempotent = RetryPolicy(
+        max_attempts=settings.DTECH_RETRY_ATTEMPTS,
+        base_delay=settings.DTECH_RETRY_BASE_DELAY,
+        max_delay=settings.DTECH_RETRY_MAX_DELAY,
+        retry_statuses=frozenset({429, 500, 502, 503, 504}),
+    )
+    unsent_only = RetryPolicy(
+        max_attempts=settings.DTECH_RETRY_ATTEMPTS,
+        base_delay=settings.DTECH_RETRY_BASE_DELAY,
+        max_delay=settings.DTECH_RETRY_MAX_DELAY,
+        retry_statuses=frozenset({429}),
+        retry_unsent_only=True,
+    )
+    return {
+        "default": unsent_only,
+        "get_status": idempotent,
+        UPLOAD_OPERATION: RetryPolicy(max_attempts=1),
+    }
+
+
+def build_rate_limiter() -> OutboundLimiter:
+    """Token buckets per operation and per account, shared through Redis when connected.
+
+    Uploads go to presigned storage, not the gateway, and are never limited.
+    """
+    def limit(rate: float, burst: int) -> Limit:
+        return (rate, float(max(burst, 1))) if rate > 0 else None
+
+    limits = {"default": limit(settings.DTECH_RATE_LIMIT, settings.DTECH_RATE_BURST)}
+    limits.update(parse_limits(settings.DTECH_RATE_LIMITS))
+    limits[UPLOAD_OPERATION] = None
+    return OutboundLimiter(
+        limits,
+        account_limit=limit(settings.DTECH_ACCOUNT_RATE_LIMIT, settings.DTECH_ACCOUNT_RATE_BURST),
+        max_wait=settings.DTECH_RATE_MAX_WAIT,
+        redis_getter=lambda: session_manager.redis,
+    )
+
+
+class DTechClient:
+    """App-scoped pooled HTTP client for all DTech traffic.
+
+    One instance is created in the FastAPI lifespan and shared by every
+    request, so connections to the gateway are reused instead of paying a
+    TCP+TLS handshake per call.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[httpx.Limits] = None,
+        timeouts: Optional[Dict[str, httpx.Timeout]] = None,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        retry_policies: Optional[Dict[str, RetryPolicy]] = None,
+        rate_limiter: Optional[OutboundLimiter] = None,
+    ):
+        self.limits = limits or build_limits()
+        self.timeouts = timeouts or build_timeouts()
+        self.retry_policies = retry_policies or build_retry_policies()
+        self.rate_limiter = rate_limiter or build_rate_limiter()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retries: Counter = Counter()
+        self.http2 = settings.DTECH_HTTP2 if http2 is None else http2
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("DTECH_HTTP2 is enabled but the 'h2' package is not installed, using HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            limits=self.limits,
+            timeout=self.timeouts["default"],
+            http2=http2,
+            transport=self._transport,
+        )
+
+    def timeout_for(self, operation: str) -> httpx.Timeout:
+        return self.timeouts.get(operation, self.timeouts["default"])
+
+    def retry_policy_for(self, operation: str) -> RetryPolicy:
+        return self.retry_policies.get(operation, self.retry_policies["default"])
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        """One breaker per upstream host, shared by every operation on it"""
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name=host,
+                failure_threshold=settings.DTECH_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.DTECH_BREAKER_RESET_TIMEOUT,
+            )
+            self.breakers[host] = breaker
+        return breaker
+
+    async def request(
+        self,
+        operation: str,
+        method: str,
+        url: str,
+        account_id: Optional[str] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a request on the shared pool with the operation's timeout and retry policy.
+
+        Each attempt first waits its turn for the operation's and the
+        account's rate limit. Raises RateLimitExceeded if that takes longer
+        than DTECH_RATE_MAX_WAIT, and CircuitOpenError without calling
+        DTech while its breaker is open. The final response is returned
+        as-is; callers still decide what an error status means.
+        """
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            return await self._send(operation, method, url, account_id, **kwargs)
+        finally:
+            self._inflight -= 1
+            if not self._inflight:
+                self._idle.set()
+
+    async def _send(self, operation: str, method: str, url: str, account_id: Optional[str], **kwargs) -> httpx.Response:
+        kwargs.setdefault("timeout", self.timeout_for(operation))
+        policy = self.retry_policy_for(operation)
+        breaker = self.breaker_for(url)
+        attempt = 0
+        waited = RATE_LIMIT_WAIT.labels(operation)
+        while True:
+            # Before the breaker, so a half-open trial is never left queued
+            waited.observe(await self.rate_limiter.acquire(operation, account_id))
+            trial = breaker.before_call()
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self._observe(operation, type(e).__name__, start)
+                breaker.record_failure()
+                retryable = not policy.retry_unsent_only or isinstance(e, UNSENT_ERRORS)
+                if not retryable or attempt + 1 >= policy.max_attempts:
+                    raise
+                delay = policy.backoff(attempt)
+            else:
+                self._observe(operation, str(response.status_code), start)
+                logger.debug("DTech %s %s -> %d (attempt %d)", operation, method, response.status_code, attempt + 1)
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in policy.retry_statuses or attempt + 1 >= policy.max_attempts:
+                    return response
+                delay = policy.backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                await response.aclose()
+            finally:
+                # A trial that ends in anything unrecorded (cancellation, a
+                # non-transport error) must not keep the circuit half-open
+                if trial:
+                    breaker.end_trial()
+            attempt += 1
+            self.retries[operation] += 1
+            logger.info("Retrying DTech %s in %.2fs (attempt %d)", operation, delay, attempt + 1)
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _observe(operation: str, status: str, start: float) -> None:
+        DTECH_REQUEST_DURATION.labels(operation, status).observe(time.perf_counter() - start)
+        DTECH_REQUESTS.labels(operation, status).inc()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for in-flight calls to finish"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Abandoning %d in-flight DTech calls after %ss", self._inflight, timeout)
+            return False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "inflight": self._inflight,
+            "retries": dict(self.retries),
+            "rate_limit": self.rate_limiter.stats(),
+            "breakers": {host: breaker.stats() for host, breaker in self.breakers.items()},
+        }
+
+    async def start(self) -> None:
+        """Open the underlying connection pool.
+
+        Building the client loads the CA bundle, which is slow enough to
+        do on a thread while the rest of startup proceeds.
+        """
+        await asyncio.to_thread(lambda: self.client)
+        logger.info(
+            "DTech client started (max_connections=%s, keepalive=%s, http2=%s)",
+            self.limits.max_connections,
+            self.limits.max_keepalive_connections,
+            self.http2,
+        )
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+_dtech_client: Optional[DTechClient] = None
+
+
+def get_dtech_client() -> DTechClient:
+    """Return the shared DTech client, creating it on first use.
+
+    The lifespan normally creates it up front; lazy creation keeps scripts
+    that call the service functions directly working.
+    """
+    global _dtech_client
+    if _dtech_client is None:
+        _dtech_client = DTechClient()
+    return _dtech_client
+
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _collect_breaker_states() -> Dict[tuple, int]:
+    client = _dtech_client
+    if client is None:
+        return {}
+    return {(host,): BREAKER_STATES[b.state] for host, b in client.breakers.items()}
+
+
+def _collect_retries() -> Dict[tuple, int]:
+    client = _dtech_client
+    if client is None:
+        return {}
+    return {(operation,): count for operation, count in client.retries.items()}
+
+
+def _collect_rate_limit_queued() -> Dict[tuple, int]:
+    client = _dtech_client
+    if client is None:
+        return {}
+    return {(operation,): depth for operation, depth in client.rate_limiter.queue_depths().items()}
+
+
+def _collect_rate_limit_rejected() -> Dict[tuple, int]:
+    client = _dtech_client
+    if client is None:
+        return {}
+    return {(operation,): count for operation, count in client.rate_limiter.rejected.items()}
+
+
+registry.callback(
+    "dtech_circuit_state", "DTech circuit breaker state (0=closed, 1=half_open, 2=open)",
+    _collect_breaker_states, ("host",),
+)
+registry.callback(
+    "dtech_retries", "DTech request retries", _collect_retries, ("operation",), type_name="counter",
+)
+registry.callback(
+    "dtech_rate_limit_queued", "DTech calls queued for a rate limit token",
+    _collect_rate_limit_queued, ("operation",),
+)
+registry.callback(
+    "dtech_rate_limit_rejected", "DTech calls that gave up waiting for a rate limit token",
+    _collect_rate_limit_rejected, ("operation",), type_name="counter",
+)
+registry.callback(
+    "dtech_inflight", "DTech calls currently in flight",
+    lambda: _dtech_client._inflight if _dtech_client is not None else 0,
+)
+
+
+async def init_dtech_client() -> DTechClient:
+    client = get_dtech_client()
+    await client.start()
+    return client
+
+
+async def close_dtech_client() -> None:
+    """Let in-flight calls finish (up to DTECH_DRAIN_TIMEOUT), then close the pool"""
+    global _dtech_client
+    if _dtech_client is not None:
+        await _dtech_client.drain(settings.DTECH_DRAIN_TIMEOUT)
+        await _dtech_client.close()
+        _dtech_client = None
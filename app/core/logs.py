@@ -0,0 +1,313 @@
+"""
+Non-blocking structured logging.
+
+Handlers attached to the root logger only put the record on a bounded
+queue; a background thread formats and writes it. Formatting is deferred
+until then, so ``logger.debug("... %s", value)`` costs a record allocation
+on the event loop and nothing more. Output is one JSON object per line
+carrying the request ID of the HTTP request that logged it.
+
+Noisy DEBUG paths can be sampled per logger prefix, e.g.
+``LOG_SAMPLING="app.utils.session=0.01,app.core.dtech_client=0.1"``.
+Records at INFO and above are never sampled.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import traceback
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from app.core.metrics import registry
+from app.core.responses import dumps
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parse ``"logger.prefix=rate,..."`` into a mapping of prefix to keep-rate"""
+    rates: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, rate = item.partition("=")
+        if not sep:
+            raise ValueError(f"LOG_SAMPLING entry {item!r} is not logger=rate")
+        rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records from the configured loggers.
+
+    The longest matching prefix wins; loggers without a rule are kept.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first so "app.core.x" overrides "app.core"
+        self.rates: Tuple[Tuple[str, float], ...] = tuple(
+            sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        )
+        self._resolved: Dict[str, float] = {}
+        self.sampled_out = 0
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, prefix_rate in self.rates:
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = prefix_rate
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp the current request ID on the record.
+
+    Runs on the logging thread of the caller, before the record crosses
+    to the writer thread where the context variable is no longer visible.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        try:
+            return dumps(entry).decode("utf-8")
+        except TypeError:
+            # An ``extra=`` value the encoder does not know; log its repr
+            return dumps({key: _plain(value) for key, value in entry.items()}).decode("utf-8")
+
+
+def _plain(value):
+    return value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+
+
+class TextFormatter(logging.Formatter):
+    """The previous human-readable format, with the request ID appended when set"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{line} [{request_id}]" if request_id else line
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that hands the record over unformatted and never blocks.
+
+    The stock handler merges ``args`` into the message before queueing,
+    which is exactly the work we want off the event loop. Records only
+    cross threads, never processes, so they can travel as they are. When
+    the writer falls behind and the queue is full, records are dropped and
+    counted instead of stalling the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            # Tracebacks hold frames that may change once the caller moves on
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip("\n")
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Owns the queue, the root handler and the writer thread"""
+
+    def __init__(self):
+        self.handler: Optional[DeferredQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.sampling: Optional[SamplingFilter] = None
+        self.output: Optional[logging.Handler] = None
+        self.queue_size = 0
+
+    @property
+    def configured(self) -> bool:
+        return self.handler is not None
+
+    def configure(
+        self,
+        level: str = "INFO",
+        fmt: str = "json",
+        sampling: str = "",
+        queue_size: int = 10000,
+        stream=None,
+    ) -> None:
+        """Route all logging through the queue; replaces any root handlers"""
+        if fmt not in ("json", "text"):
+            raise ValueError("LOG_FORMAT must be 'json' or 'text'")
+        self.stop()
+        self.queue_size = queue_size
+        self.output = logging.StreamHandler(stream or sys.stderr)
+        self.output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        self.sampling = SamplingFilter(parse_sampling(sampling))
+        self.handler = DeferredQueueHandler(queue.Queue(maxsize=queue_size))
+        self.handler.addFilter(self.sampling)
+        self.handler.addFilter(RequestContextFilter())
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        self.start()
+
+    def start(self) -> None:
+        if self.handler is None or self.listener is not None:
+            return
+        self.listener = QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Write out everything queued so far and stop the writer thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def _after_fork(self) -> None:
+        # The writer thread does not survive fork, and the queue's lock may
+        # have been held by it at the time; start over with fresh ones.
+        if self.handler is None:
+            return
+        self.listener = None
+        self.handler.queue = queue.Queue(maxsize=self.queue_size)
+        self.start()
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.configured,
+            "depth": self.handler.queue.qsize() if self.handler else 0,
+            "dropped": self.handler.dropped if self.handler else 0,
+            "sampled_out": self.sampling.sampled_out if self.sampling else 0,
+        }
+
+
+pipeline = LogPipeline()
+atexit.register(pipeline.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pipeline._after_fork)
+
+registry.callback("log_queue_depth", "Log records waiting for the writer thread", lambda: pipeline.stats()["depth"])
+registry.callback(
+    "log_records_discarded", "Log records not written, by reason",
+    lambda: {
+        ("queue_full",): pipeline.stats()["dropped"],
+        ("sampled",): pipeline.stats()["sampled_out"],
+    },
+    ("reason",), type_name="counter",
+)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, force: bool = False) -> None:
+    """Install the queued pipeline from settings unless it is already in place.
+
+    The launcher configures logging before the app is imported; worker
+    processes that import the app on their own (uvicorn's reloader and
+    multi-process manager spawn fresh interpreters) pick it up here.
+    """
+    if pipeline.configured and not force:
+        return
+    from config.settings import settings
+
+    pipeline.configure(
+        level=level or settings.LOG_LEVEL,
+        fmt=fmt or settings.LOG_FORMAT,
+        sampling=settings.LOG_SAMPLING,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+
+
+class RequestIdMiddleware:
+    """Pure ASGI middleware binding a request ID to everything logged while handling it.
+
+    A well-formed incoming ``X-Request-ID`` is reused so IDs follow a
+    request across services; otherwise one is generated. The ID is echoed
+    in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                if 0 < len(value) <= MAX_REQUEST_ID_LENGTH and value.isascii():
+                    request_id = value.decode("ascii")
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+        header_value = request_id.encode("ascii")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER, header_value)]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,309 @@
+"""
+Client-side rate limiting for outbound DTech traffic.
+
+Every DTech attempt takes a token from its operation's bucket and, when the
+call is made on behalf of an account, from that account's bucket. With
+Redis the buckets live there and are shared by every worker; both are
+checked and debited in one script call using Redis' clock. Without Redis
+each worker keeps its own buckets.
+
+Callers that cannot go immediately queue per operation. A dispatcher
+serves the queued accounts round-robin, so one account with a thousand
+queued calls delays another account's single call by at most one turn.
+An account that is over its own limit is skipped until it has a token,
+without holding up the others.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# (rate per second, burst); None means unlimited
+Limit = Optional[Tuple[float, float]]
+
+# Check every bucket and debit all of them only if each has a token.
+# Returns, per bucket, the seconds until it will have one (0 if it did).
+TAKE_TOKENS_SCRIPT = """
+redis.replicate_commands()
+local now = redis.call('TIME')
+local t = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local levels = {}
+local waits = {}
+local blocked = false
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local level = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or t
+    level = math.min(burst, level + math.max(0, t - ts) * rate)
+    levels[i] = level
+    if level < 1 then
+        waits[i] = tostring((1 - level) / rate)
+        blocked = true
+    else
+        waits[i] = '0'
+    end
+end
+if not blocked then
+    for i, key in ipairs(KEYS) do
+        local rate = tonumber(ARGV[2 * i - 1])
+        local burst = tonumber(ARGV[2 * i])
+        redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', t)
+        redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+    end
+end
+return waits
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of calling DTech when a call waited too long for a token"""
+
+    def __init__(self, operation: str, waited: float):
+        super().__init__(f"DTech {operation} call waited {waited:.1f}s for a rate limit token")
+        self.operation = operation
+        self.retry_in = waited
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """Parse ``"operation=rate:burst,..."``; a rate of 0 disables the limit"""
+    limits: Dict[str, Limit] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        operation, sep, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        if not sep:
+            raise ValueError(f"DTECH_RATE_LIMITS entry {item!r} is not operation=rate[:burst]")
+        rate = float(rate)
+        limits[operation.strip()] = (rate, float(burst) if burst else max(1.0, rate)) if rate > 0 else None
+    return limits
+
+
+class TokenBucket:
+    """In-process token bucket, used when Redis is not available"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "clock")
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available, refilling first"""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _OperationQueue:
+    """Waiters for one operation, grouped by account and served round-robin"""
+
+    def __init__(self):
+        self.waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self.ring: Deque[str] = deque()
+        self.arrived = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+
+    def depth(self) -> int:
+        return sum(len(waiters) for waiters in self.waiters.values())
+
+    def push(self, account: str, future: asyncio.Future) -> None:
+        waiters = self.waiters.get(account)
+        if waiters is None:
+            waiters = self.waiters[account] = deque()
+            self.ring.append(account)
+        waiters.append(future)
+        self.arrived.set()
+
+    def head(self, account: str) -> Optional[asyncio.Future]:
+        """The account's oldest live waiter; drops the account once it has none"""
+        waiters = self.waiters[account]
+        while waiters and waiters[0].done():
+            waiters.popleft()
+        if waiters:
+            return waiters[0]
+        del self.waiters[account]
+        self.ring.remove(account)
+        return None
+
+
+class OutboundLimiter:
+    """Per-operation and per-account token buckets with fair queueing.
+
+    ``limits`` maps operations to ``(rate, burst)``; operations not listed
+    use ``limits["default"]``, and a ``None`` limit means unlimited. Calls
+    that wait longer than ``max_wait`` raise RateLimitExceeded.
+
+    In-process buckets are kept in least recently used order. A bucket
+    idle for ``burst / rate`` seconds has refilled, which is no different
+    from a new one, so it is dropped; beyond ``max_buckets`` the least
+    recently used go regardless. Account IDs come from request paths, so
+    the map must not grow with every ID a client sends.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Limit],
+        account_limit: Limit = None,
+        max_wait: float = 10.0,
+        redis_getter: Callable[[], Any] = lambda: None,
+        clock: Callable[[], float] = time.monotonic,
+        max_buckets: int = 10000,
+    ):
+        self.limits = limits
+        self.account_limit = account_limit
+        self.max_wait = max_wait
+        self._redis_getter = redis_getter
+        self._clock = clock
+        self._script = None
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._queues: Dict[str, _OperationQueue] = {}
+        self.granted: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.redis_errors = 0
+
+    def limit_for(self, operation: str) -> Limit:
+        return self.limits.get(operation, self.limits.get("default"))
+
+    def _buckets_for(self, operation: str, account_id: Optional[str]) -> List[Tuple[str, float, float]]:
+        buckets = []
+        limit = self.limit_for(operation)
+        if limit is not None:
+            buckets.append((f"ratelimit:op:{operation}", *limit))
+        if account_id and self.account_limit is not None:
+            buckets.append((f"ratelimit:account:{account_id}", *self.account_limit))
+        return buckets
+
+    async def _take(self, buckets: List[Tuple[str, float, float]]) -> List[float]:
+        """Take a token from every bucket, or from none; returns each bucket's wait"""
+        redis = self._redis_getter()
+        if redis is not None:
+            try:
+                if self._script is None or self._script.registered_client is not redis:
+                    self._script = redis.register_script(TAKE_TOKENS_SCRIPT)
+                args = []
+                for _, rate, burst in buckets:
+                    args += [rate, burst]
+                waits = await self._script(keys=[key for key, _, _ in buckets], args=args)
+                return [float(wait) for wait in waits]
+            except RedisError as e:
+                self.redis_errors += 1
+                logger.warning("Shared rate limit unavailable, limiting this worker only: %s", e)
+        local = []
+        for key, rate, burst in buckets:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst, self._clock)
+            else:
+                self._buckets.move_to_end(key)
+            local.append(bucket)
+        waits = [bucket.wait_time() for bucket in local]
+        if not any(waits):
+            for bucket in local:
+                bucket.tokens -= 1
+        self._prune_buckets()
+        return waits
+
+    def _prune_buckets(self) -> None:
+        """Drop least recently used buckets that have refilled, and any over max_buckets"""
+        now = self._clock()
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_buckets and now - bucket.updated < bucket.burst / bucket.rate:
+                break
+            del self._buckets[key]
+
+    async def acquire(self, operation: str, account_id: Optional[str] = None) -> float:
+        """Wait for this call's turn and tokens; returns the seconds waited"""
+        buckets = self._buckets_for(operation, account_id)
+        if not buckets:
+            return 0.0
+        queue = self._queues.get(operation)
+        if queue is None:
+            queue = self._queues[operation] = _OperationQueue()
+        if not queue.waiters and not any(await self._take(buckets)):
+            self.granted[operation] = self.granted.get(operation, 0) + 1
+            return 0.0
+
+        start = self._clock()
+        future = asyncio.get_running_loop().create_future()
+        queue.push(account_id or "", future)
+        if queue.dispatcher is None or queue.dispatcher.done():
+            queue.dispatcher = asyncio.create_task(self._dispatch(operation, queue))
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected[operation] = self.rejected.get(operation, 0) + 1
+            raise RateLimitExceeded(operation, self._clock() - start)
+        self.granted[operation] = self.granted.get(operation, 0) + 1
+        return self._clock() - start
+
+    async def _dispatch(self, operation: str, queue: _OperationQueue) -> None:
+        # Accounts over their own limit, and when they will have a token
+        deferred: Dict[str, float] = {}
+        limited_op = self.limit_for(operation) is not None
+        while queue.ring:
+            now = self._clock()
+            ready = [account for account in queue.ring if deferred.get(account, 0.0) <= now]
+            if not ready:
+                # Everyone is over their account limit; sleep until the
+                # first of them recovers or a new account shows up
+                queue.arrived.clear()
+                try:
+                    await asyncio.wait_for(queue.arrived.wait(), min(deferred.values()) - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            account = queue.ring[0]
+            if account not in ready:
+                queue.ring.rotate(-1)
+                continue
+            future = queue.head(account)
+            if future is None:
+                deferred.pop(account, None)
+                continue
+            waits = await self._take(self._buckets_for(operation, account or None))
+            op_wait, account_wait = (waits[0], waits[1:]) if limited_op else (0.0, waits)
+            if op_wait:
+                # Nobody can call this operation yet; keep the turn order
+                await asyncio.sleep(op_wait)
+            elif any(account_wait):
+                deferred[account] = self._clock() + max(account_wait)
+                queue.ring.rotate(-1)
+            else:
+                deferred.pop(account, None)
+                queue.waiters[account].popleft()
+                if not future.done():
+                    future.set_result(None)
+                queue.ring.rotate(-1)
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {operation: queue.depth() for operation, queue in self._queues.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._redis_getter() is not None else "memory",
+            "queued": self.queue_depths(),
+            "local_buckets": len(self._buckets),
+            "granted": dict(self.granted),
+            "rejected": dict(self.rejected),
+            "redis_errors": self.redis_errors,
+        }
+
+
+RATE_LIMIT_WAIT = registry.histogram(
+    "dtech_rate_limit_wait_seconds", "Time DTech calls spent queued for a rate limit token", ("operation",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
@@ -0,0 +1,124 @@
+import email.utils
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, FrozenSet, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling DTech while its circuit breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"DTech circuit '{name}' is open; retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How an operation may be retried.
+
+    ``retry_unsent_only`` limits transport-error retries to failures where
+    the request provably never reached DTech (connect errors, pool
+    timeouts), which is the only safe case for non-idempotent calls.
+    """
+    max_attempts: int = 1
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 502, 503, 504})
+    retry_unsent_only: bool = False
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, deferring to Retry-After when given"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    fail fast for ``reset_timeout`` seconds. It then half-opens and lets a
+    single trial call through: success closes it, failure re-opens it.
+    """
+    name: str
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    state: str = "closed"
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    trial_in_flight: bool = False
+    times_opened: int = 0
+    rejected: int = 0
+    clock: Callable[[], float] = field(default=time.monotonic, repr=False)
+
+    def before_call(self) -> bool:
+        """Fail fast while open; returns True if this call is the half-open trial"""
+        if self.state == "open":
+            elapsed = self.clock() - self.opened_at
+            if elapsed < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.trial_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 0.0)
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def end_trial(self) -> None:
+        """Free the trial slot; a no-op once the trial recorded its outcome"""
+        self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("DTech circuit '%s' closed", self.name)
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning(
+                    "DTech circuit '%s' opened after %d consecutive failures",
+                    self.name, self.consecutive_failures
+                )
+            self.state = "open"
+            self.opened_at = self.clock()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
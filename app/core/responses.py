@@ -0,0 +1,32 @@
+import json
+import logging
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+    logger.warning("orjson is not installed, falling back to the stdlib json encoder")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes, via orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    Used as the app's default response class. FastAPI's own ORJSONResponse
+    is deprecated in recent releases and warns on import, so the few lines
+    it needs live here.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
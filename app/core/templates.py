@@ -0,0 +1,4 @@
+from fastapi.templating import Jinja2Templates
+
+# One environment (and template cache) shared by every router
+templates = Jinja2Templates(directory="app/templates")
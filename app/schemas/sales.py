@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, validator, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, validator, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class LoginRequest(BaseModel):
@@ -30,11 +30,35 @@ class StartSalesRequest(BaseRequest):
     user: User
     lead: Lead
 
+class StatusQuery(BaseModel):
+    spid: str = Field(..., description="The sales process ID")
+    account_id: str = Field(..., description="The DTech account ID")
+
+class BatchStatusRequest(BaseModel):
+    items: List[StatusQuery] = Field(..., min_length=1)
+
 class SalesProcessResponse(BaseModel):
     sales_process_id: str
     url: str
     url_expiry: datetime
 
+class ContinueProcessResponse(BaseModel):
+    url: str
+    url_expiry: datetime
+
+# DTech may add fields to these; keep and pass them through untouched
+class ProcessStatusResponse(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    status: str
+    sales_process_id: Optional[str] = None
+
+class StopProcessResponse(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    sales_process_id: Optional[str] = None
+    status: Optional[str] = None
+
 class RecordingUploadRequest(BaseModel):
     account_id: str = Field(..., min_length=36, max_length=36)
     date_start: datetime
@@ -62,3 +86,21 @@ class RecordingUploadResponse(BaseModel):
     upload_url: str
     success: bool = True
     upload_id: Optional[str] = None
+
+class UploadStatusUpdate(BaseModel):
+    status: Literal["uploading", "completed", "failed"]
+    progress: Optional[float] = Field(None, ge=0, le=1)
+    error: Optional[str] = Field(None, max_length=500)
+
+class ProcessSummary(BaseModel):
+    sales_process_id: str
+    account_id: str
+    agent_id: str
+    campaign_code: str
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+class ProcessListResponse(BaseModel):
+    items: List[ProcessSummary]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor for the next page; null when exhausted")
@@ -1,19 +1,74 @@
+import hashlib
+import os
+import time
 import httpx
-import json
-from app.schemas.sales import User, Lead, SalesProcessResponse
+from app.schemas.sales import (
+    User, Lead, SalesProcessResponse, ContinueProcessResponse,
+    ProcessStatusResponse, StopProcessResponse
+)
 from config.settings import settings
 from app.utils.aws_auth import AWSRequestSigner
-from typing import Dict, Any
+from app.core.dtech_client import get_dtech_client, UPLOAD_OPERATION
+from app.core.metrics import SIGNING_DURATION
+from app.core.responses import dumps
+from app.utils.file_utils import aiter_file_chunks, encode_md5
+from typing import Dict, Any, Optional
 from datetime import datetime
 
-# Initialize AWS request signer
-signer = AWSRequestSigner(
-    access_key=settings.AWS_ACCESS_KEY_ID,
-    secret_key=settings.AWS_SECRET_ACCESS_KEY,
-    region=settings.AWS_REGION
-)
+_signer: Optional[AWSRequestSigner] = None
+_signing_duration = SIGNING_DURATION.labels()
+
+def get_signer() -> AWSRequestSigner:
+    """Return the AWS request signer, creating it on first use"""
+    global _signer
+    if _signer is None:
+        _signer = AWSRequestSigner(
+            access_key=settings.AWS_ACCESS_KEY_ID,
+            secret_key=settings.AWS_SECRET_ACCESS_KEY,
+            region=settings.AWS_REGION or "eu-west-1",
+            service=settings.AWS_SERVICE or "execute-api"
+        )
+    return _signer
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Serialize a request body once; these exact bytes are signed and sent"""
+    return dumps(payload)
+
+async def send_signed(
+    operation: str,
+    method: str,
+    url: str,
+    payload: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    account_id: Optional[str] = None
+) -> httpx.Response:
+    """Sign a DTech request over its final body bytes and send it on the shared client.
+
+    ``account_id`` selects the per-account rate limit bucket.
+    """
+    start = time.perf_counter()
+    body = encode_payload(payload) if payload is not None else None
+    request_headers = {"Accept": "application/json"}
+    if body is not None:
+        request_headers["Content-Type"] = "application/json"
+    if headers:
+        request_headers.update(headers)
 
-async def create_process(user: User, lead: Lead) -> Dict[str, Any]:
+    signed_headers = get_signer().sign_request(
+        method=method,
+        url=url,
+        data=body,
+        headers=request_headers
+    )
+    _signing_duration.observe(time.perf_counter() - start)
+
+    response = await get_dtech_client().request(
+        operation, method, url, account_id=account_id, content=body, headers=signed_headers
+    )
+    response.raise_for_status()
+    return response
+
+async def create_process(user: User, lead: Lead) -> SalesProcessResponse:
     """
     Create a new sales process.
     Example Response:
@@ -29,88 +84,38 @@ async def create_process(user: User, lead: Lead) -> Dict[str, Any]:
         "user": user.model_dump(),
         "lead": lead.model_dump(exclude_none=True)
     }
-    
-    # Convert payload to JSON string for signing
-    data = json.dumps(payload)
-    
-    # Get signed headers
-    headers = signer.sign_request(
-        method="POST",
-        url=url,
-        data=data,
-        headers={
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-    )
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return SalesProcessResponse(**response.json()).model_dump()
 
-async def continue_process(spid: str, user: User) -> Dict[str, Any]:
+    response = await send_signed("create_process", "POST", url, payload, account_id=payload["account_id"])
+    return SalesProcessResponse.model_validate_json(response.content)
+
+async def continue_process(spid: str, user: User) -> ContinueProcessResponse:
     """Continue an existing sales process"""
     url = f"{settings.DIFFERENT_API_TEST}/ext/continue/{spid}"
     payload = {
         "account_id": settings.DIFFERENT_ACCOUNT_ID,
         "user": user.model_dump()
     }
-    
-    data = json.dumps(payload)
-    headers = signer.sign_request(
-        method="POST",
-        url=url,
-        data=data,
-        headers={
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-    )
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
 
-async def get_status(spid: str, account_id: str) -> Dict[str, Any]:
+    response = await send_signed("continue_process", "POST", url, payload, account_id=payload["account_id"])
+    return ContinueProcessResponse.model_validate_json(response.content)
+
+async def get_status(spid: str, account_id: str) -> ProcessStatusResponse:
     """Get the status of a sales process"""
     url = f"{settings.DIFFERENT_API_TEST}/ext/status/{spid}/{account_id}"
-    
-    headers = signer.sign_request(
-        method="GET",
-        url=url,
-        headers={"Accept": "application/json"}
-    )
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
 
-async def stop_process(spid: str, account_id: str, reason: str) -> Dict[str, Any]:
+    response = await send_signed("get_status", "GET", url, account_id=account_id)
+    return ProcessStatusResponse.model_validate_json(response.content)
+
+async def stop_process(spid: str, account_id: str, reason: str) -> StopProcessResponse:
     """Stop an ongoing sales process"""
     url = f"{settings.DIFFERENT_API_TEST}/ext/stop/{spid}"
     payload = {
         "account_id": account_id,
         "reason": reason
     }
-    
-    data = json.dumps(payload)
-    headers = signer.sign_request(
-        method="POST",
-        url=url,
-        data=data,
-        headers={
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-    )
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
+
+    response = await send_signed("stop_process", "POST", url, payload, account_id=account_id)
+    return StopProcessResponse.model_validate_json(response.content)
 
 async def get_recording_url(
     spid: str,
@@ -134,23 +139,13 @@ async def get_recording_url(
     }
     if external_ref:
         payload["external_ref"] = external_ref
-    
-    data = json.dumps(payload)
-    headers = signer.sign_request(
-        method="POST",
-        url=url,
-        data=data,
-        headers={
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "Content-MD5": recording_hash
-        }
+
+    response = await send_signed(
+        "get_recording_url", "POST", url, payload,
+        headers={"Content-MD5": recording_hash},
+        account_id=account_id
     )
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
+    return response.json()
 
 async def upload_recording_file(
     upload_url: str,
@@ -161,6 +156,11 @@ async def upload_recording_file(
     """
     Upload a recording file to the provided presigned URL.
     
+    The file is streamed in CHUNK_SIZE pieces so memory stays flat for
+    hour-long recordings. Content-MD5 has to be sent before the body, so the
+    caller's hash is used for the header and the file's MD5 is recomputed in
+    the same pass to catch a stale or mismatched hash.
+    
     Args:
         upload_url: The presigned URL from get_recording_url
         file_path: Path to the audio file
@@ -173,18 +173,23 @@ async def upload_recording_file(
     try:
         headers = {
             "Content-Type": content_type,
-            "Content-MD5": recording_hash
+            "Content-MD5": recording_hash,
+            # Presigned storage URLs reject chunked transfer encoding
+            "Content-Length": str(os.path.getsize(file_path))
         }
         
-        with open(file_path, 'rb') as f:
-            async with httpx.AsyncClient() as client:
-                response = await client.put(
-                    upload_url,
-                    content=f.read(),
-                    headers=headers
-                )
-                response.raise_for_status()
-                return True
+        md5_hash = hashlib.md5()
+        response = await get_dtech_client().request(
+            UPLOAD_OPERATION,
+            "PUT",
+            upload_url,
+            content=aiter_file_chunks(file_path, md5_hash),
+            headers=headers
+        )
+        response.raise_for_status()
+        if encode_md5(md5_hash) != recording_hash:
+            raise ValueError("File content does not match recording_hash")
+        return True
     except Exception as e:
         raise Exception(f"Failed to upload recording: {str(e)}")
 
@@ -199,14 +204,15 @@ async def activate_api_client(security_group: str, account_id: str, request_toke
         "request_token": request_token
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            url,
-            json=payload,
-            headers={
-                "Accept": "application/json",
-                "Content-Type": "application/json"
-            }
-        )
-        response.raise_for_status()
-        return response.json()
+    response = await get_dtech_client().request(
+        "activate_api_client",
+        "POST",
+        url,
+        content=encode_payload(payload),
+        headers={
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        }
+    )
+    response.raise_for_status()
+    return response.json()
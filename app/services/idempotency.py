@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.metrics import registry
+from app.schemas.sales import StartSalesRequest
+from app.utils.memory_store import MemoryStore
+from app.utils.session import session_manager
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+
+# Extend a pending claim only while it is still the one this worker set
+RENEW_CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Drop the pending claim only if it is still ours; after a lapse the key may
+# hold another worker's claim or its stored result
+RELEASE_CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Store a result unless another worker already stored one
+STORE_RESULT_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and current ~= ARGV[1] and cjson.decode(current)['state'] == 'done' then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+return 1
+"""
+
+
+class IdempotencyError(Exception):
+    status_code = 409
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    """The key was already used for a request with a different body"""
+    status_code = 422
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """Another worker still holds the key and did not finish in time"""
+    status_code = 409
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def start_request_key(request: StartSalesRequest, idempotency_key: Optional[str]) -> Tuple[str, str, float]:
+    """Return (key, fingerprint, ttl) for a /start request.
+
+    A client-supplied Idempotency-Key is honoured for IDEMPOTENCY_KEY_TTL and
+    must always arrive with the same body. Without one, the lead (which
+    carries the campaign code) and account are hashed so retries from lead
+    sources collapse onto the first process for IDEMPOTENCY_DEDUPE_TTL.
+    """
+    if idempotency_key:
+        fingerprint = _digest(request.model_dump(mode="json"))
+        return f"start:key:{_digest(idempotency_key)}", fingerprint, settings.IDEMPOTENCY_KEY_TTL
+    content = _digest({
+        "account_id": request.account_id,
+        "lead": request.lead.model_dump(mode="json", exclude_none=True),
+    })
+    return f"start:lead:{content}", content, settings.IDEMPOTENCY_DEDUPE_TTL
+
+
+class IdempotencyStore:
+    """Remembers the result of a non-idempotent call under a key.
+
+    Completed results are replayed until their TTL expires. Concurrent
+    duplicates in this process share the in-flight call; with Redis, a
+    short-lived ``pending`` claim (SET NX) makes duplicates on other
+    workers poll for the result instead of calling upstream again. The
+    claim is renewed every ``lock_ttl / 3`` seconds while the call runs, so
+    it cannot lapse under a slow create (rate-limit wait, retries, DTech
+    timeouts) and let a duplicate call upstream a second time. Failed
+    calls release the claim and are not remembered, so a retry can succeed.
+    """
+
+    def __init__(
+        self,
+        lock_ttl: float,
+        wait_timeout: float,
+        max_entries: int = 10000,
+        redis_getter: Callable[[], Any] = lambda: None,
+        poll_interval: float = 0.05,
+    ):
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._memory = MemoryStore(max_entries=max_entries)
+        self._redis_getter = redis_getter
+        self._inflight: Dict[str, Tuple[asyncio.Task, str]] = {}
+        self._scripts: Dict[str, Any] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.coalesced = 0
+        self.conflicts = 0
+
+    @staticmethod
+    def _cache_key(key: str) -> str:
+        return f"idempotency:{key}"
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        redis = self._redis_getter()
+        if redis is not None:
+            try:
+                raw = await redis.get(self._cache_key(key))
+            except RedisError as e:
+                logger.warning("Idempotency read failed: %s", e)
+                raw = None
+        else:
+            raw = self._memory.get(self._cache_key(key))
+        return json.loads(raw) if raw else None
+
+    async def _claim(self, key: str, claim: str) -> bool:
+        """Take the pending marker for ``key``; always succeeds without Redis"""
+        redis = self._redis_getter()
+        if redis is None:
+            return True
+        try:
+            return bool(await redis.set(self._cache_key(key), claim, nx=True, px=max(1, int(self.lock_ttl * 1000))))
+        except RedisError as e:
+            logger.warning("Idempotency claim failed, proceeding without it: %s", e)
+            return True
+
+    async def _script(self, redis, source: str, key: str, *args) -> Any:
+        script = self._scripts.get(source)
+        if script is None or script.registered_client is not redis:
+            script = self._scripts[source] = redis.register_script(source)
+        return await script(keys=[self._cache_key(key)], args=list(args))
+
+    async def _keep_claim(self, key: str, claim: str) -> None:
+        """Renew our pending marker until cancelled or it is no longer ours"""
+        redis = self._redis_getter()
+        if redis is None:
+            return
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                if not await self._script(redis, RENEW_CLAIM_SCRIPT, key, claim, max(1, int(self.lock_ttl * 1000))):
+                    logger.warning("Idempotency claim %s is no longer held; not renewing it", key)
+                    return
+            except RedisError as e:
+                logger.warning("Idempotency claim renewal failed: %s", e)
+
+    async def _release(self, key: str, claim: str) -> None:
+        redis = self._redis_getter()
+        if redis is None:
+            return
+        try:
+            await self._script(redis, RELEASE_CLAIM_SCRIPT, key, claim)
+        except RedisError as e:
+            logger.warning("Idempotency release failed: %s", e)
+
+    async def _store(self, key: str, claim: str, fingerprint: str, value: Any, ttl: float) -> None:
+        raw = json.dumps({"state": DONE, "fingerprint": fingerprint, "stored_at": time.time(), "value": value})
+        redis = self._redis_getter()
+        if redis is not None:
+            try:
+                if not await self._script(redis, STORE_RESULT_SCRIPT, key, claim, raw, max(1, int(ttl * 1000))):
+                    logger.warning("Idempotency result for %s was already stored by another worker", key)
+            except RedisError as e:
+                logger.warning("Idempotency write failed: %s", e)
+        else:
+            self._memory.set(self._cache_key(key), raw, ttl)
+
+    def _replay(self, envelope: Dict[str, Any], fingerprint: str) -> Any:
+        if envelope["fingerprint"] != fingerprint:
+            self.conflicts += 1
+            raise IdempotencyKeyReused("Idempotency-Key was already used with a different request body")
+        self.replayed += 1
+        return envelope["value"]
+
+    async def _execute(
+        self, key: str, fingerprint: str, ttl: float, call: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        deadline = time.monotonic() + self.wait_timeout
+        # The owner token tells our claim apart from a duplicate's identical one
+        claim = json.dumps({"state": PENDING, "fingerprint": fingerprint, "owner": uuid.uuid4().hex})
+        while not await self._claim(key, claim):
+            # Another worker holds the key: wait for its result, or for the
+            # claim to disappear (it failed or its lock expired) and retry
+            envelope = await self._load(key)
+            if envelope is not None and envelope["state"] == DONE:
+                return self._replay(envelope, fingerprint), True
+            if envelope is not None and envelope["fingerprint"] != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyKeyReused("Idempotency-Key is in use by a request with a different body")
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress("A request with this idempotency key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+        renewer = asyncio.create_task(self._keep_claim(key, claim))
+        try:
+            value = await call()
+        except BaseException:
+            renewer.cancel()
+            await self._release(key, claim)
+            raise
+        renewer.cancel()
+        self.executed += 1
+        await self._store(key, claim, fingerprint, value, ttl)
+        return value, False
+
+    async def run(
+        self, key: str, fingerprint: str, ttl: float, call: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Return ``(result, replayed)``, calling ``call`` at most once per key"""
+        envelope = await self._load(key)
+        if envelope is not None and envelope["state"] == DONE:
+            return self._replay(envelope, fingerprint), True
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            task, inflight_fingerprint = inflight
+            if inflight_fingerprint != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyKeyReused("Idempotency-Key is in use by a request with a different body")
+            self.coalesced += 1
+            value, _ = await asyncio.shield(task)
+            return value, True
+        task = asyncio.create_task(self._execute(key, fingerprint, ttl, call))
+        self._inflight[key] = (task, fingerprint)
+        task.add_done_callback(lambda t: self._inflight.pop(key, None))
+        # Shield so a disconnecting client doesn't cancel the call its
+        # duplicates are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._redis_getter() is not None else "memory",
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "coalesced": self.coalesced,
+            "conflicts": self.conflicts,
+            "inflight": len(self._inflight),
+        }
+
+
+idempotency = IdempotencyStore(
+    lock_ttl=settings.IDEMPOTENCY_LOCK_TTL,
+    wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT,
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    redis_getter=lambda: session_manager.redis,
+)
+
+registry.callback(
+    "idempotency_requests", "/start requests by idempotency outcome",
+    lambda: {
+        ("executed",): idempotency.executed,
+        ("replayed",): idempotency.replayed,
+        ("coalesced",): idempotency.coalesced,
+        ("conflict",): idempotency.conflicts,
+    },
+    ("outcome",), type_name="counter",
+)
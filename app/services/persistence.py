@@ -0,0 +1,448 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from appwrite.exception import AppwriteException
+from appwrite.services.databases import Databases
+
+from app.core.appwrite_async import appwrite
+from app.core.appwrite_client import registry as appwrite_registry
+from app.core.metrics import registry
+from app.core.resilience import RetryPolicy
+from app.schemas.sales import Lead, User
+from app.utils.background import fill_batch
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SALES = "sales"
+RECORDINGS = "recordings"
+
+CREATE = "create"
+UPDATE = "update"
+
+
+class PersistenceJournal:
+    """Local spill file for records that could not be written to Appwrite.
+
+    SQLite in WAL mode, like the recording hash cache, so every worker on a
+    host can append to and replay from the same journal. ``take`` removes
+    the rows it returns in one transaction, so two workers never replay the
+    same record.
+    """
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, timeout=10, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_writes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, record TEXT NOT NULL, replays INTEGER NOT NULL)"
+        )
+
+    def append(self, records: List[dict]) -> None:
+        rows = [(json.dumps(record, default=str), record.get("replays", 0)) for record in records]
+        with self._lock:
+            self._conn.executemany("INSERT INTO pending_writes (record, replays) VALUES (?, ?)", rows)
+
+    def take(self, limit: int) -> List[dict]:
+        """Remove and return up to ``limit`` of the oldest records"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, record, replays FROM pending_writes ORDER BY id LIMIT ?", (limit,)
+                ).fetchall()
+                self._conn.executemany("DELETE FROM pending_writes WHERE id = ?", [(row[0],) for row in rows])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [{**json.loads(record), "replays": replays} for _, record, replays in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_writes").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def coalesce(batch: List[dict]) -> List[dict]:
+    """Merge records for the same document, keeping first-seen order.
+
+    A create followed by updates becomes one create with the final field
+    values, so a batch never races an update against the create it
+    depends on.
+    """
+    merged: Dict[tuple, dict] = {}
+    for record in batch:
+        key = (record["collection"], record["id"])
+        previous = merged.get(key)
+        if previous is None:
+            merged[key] = record
+            continue
+        merged[key] = {
+            **previous,
+            "op": CREATE if CREATE in (previous["op"], record["op"]) else UPDATE,
+            "data": {**previous["data"], **record["data"]},
+        }
+    return list(merged.values())
+
+
+class WriteBehindStore:
+    """Queues sales process and recording records and writes them to Appwrite later.
+
+    Request handlers call ``enqueue`` after DTech has answered; it never
+    waits. A single flusher task collects up to ``batch_size`` records or
+    whatever arrived within ``flush_interval`` and writes them with at most
+    ``concurrency`` Appwrite calls at once, retrying transient failures.
+    Records that still fail, or that arrive while Appwrite is known to be
+    down or the queue is full, are spilled to the local journal and
+    replayed every ``replay_interval`` seconds once Appwrite is healthy.
+    """
+
+    def __init__(
+        self,
+        database_id: str,
+        collections: Dict[str, str],
+        journal_path: str = "",
+        maxsize: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        concurrency: int = 4,
+        retry_policy: Optional[RetryPolicy] = None,
+        replay_interval: float = 30.0,
+        max_replays: int = 10,
+        drain_timeout: float = 5.0,
+    ):
+        self.database_id = database_id
+        self.collections = collections
+        self.journal_path = journal_path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.concurrency = concurrency
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=5.0)
+        self.replay_interval = replay_interval
+        self.max_replays = max_replays
+        self.drain_timeout = drain_timeout
+        self._journal: Optional[PersistenceJournal] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: List[asyncio.Task] = []
+        self._spills: set = set()
+        self._batch: List[dict] = []
+        self._writing: Dict[int, dict] = {}
+        self.journal_depth = 0
+        self.enqueued = 0
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.discarded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.database_id and all(self.collections.values()))
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def enqueue(self, collection: str, op: str, document_id: str, data: dict) -> None:
+        """Queue a document write without waiting"""
+        if not self.enabled:
+            return
+        record = {"collection": collection, "op": op, "id": document_id, "data": data}
+        self.enqueued += 1
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._spill_later([record])
+
+    def _write_sync(self, record: dict) -> None:
+        databases = appwrite_registry.service(Databases)
+        collection_id = self.collections[record["collection"]]
+        if record["op"] == CREATE:
+            databases.create_document(self.database_id, collection_id, record["id"], record["data"])
+        else:
+            databases.update_document(self.database_id, collection_id, record["id"], record["data"])
+
+    async def _write(self, record: dict) -> bool:
+        """Write one record; False means it should go to the journal"""
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    await appwrite.run(self._write_sync, record)
+                return True
+            except AppwriteException as e:
+                if e.code == 409 and record["op"] == CREATE:
+                    # Written before (a replay, or a create merged after a
+                    # spill); bring it up to date instead
+                    record = {**record, "op": UPDATE}
+                    continue
+                # Transport errors carry no status code and are retried. A 404
+                # on update is final like any other 4xx: the document was not
+                # created by this service, and replays would only repeat it.
+                if e.code is not None and 400 <= e.code < 500 and e.code != 429:
+                    self.rejected += 1
+                    logger.error(
+                        "Appwrite rejected %s %s/%s: %s", record["op"], record["collection"], record["id"], e
+                    )
+                    return True
+                error = e
+            except Exception as e:
+                error = e
+            attempt += 1
+            if attempt >= policy.max_attempts:
+                logger.warning(
+                    "Giving up on %s %s/%s after %d attempts: %s",
+                    record["op"], record["collection"], record["id"], attempt, error
+                )
+                return False
+            await asyncio.sleep(policy.backoff(attempt - 1))
+
+    async def _write_batch(self, batch: List[dict]) -> List[dict]:
+        """Write a batch concurrently; returns the records that failed.
+
+        Records stay in ``_writing`` until they are written, so if the
+        batch is cancelled stop() can journal exactly the unwritten ones.
+        """
+        batch = coalesce(batch)
+        for record in batch:
+            self._writing[id(record)] = record
+
+        async def write(record: dict) -> Optional[dict]:
+            if await self._write(record):
+                self._writing.pop(id(record), None)
+                self.written += 1
+                return None
+            return record
+
+        try:
+            if not await appwrite.run(appwrite_registry.check_health):
+                failed = batch
+            else:
+                results = await asyncio.gather(*(write(record) for record in batch))
+                failed = [record for record in results if record is not None]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Persisting a batch of %d records failed: %s", len(batch), e)
+            failed = [record for record in batch if id(record) in self._writing]
+        for record in batch:
+            self._writing.pop(id(record), None)
+        return failed
+
+    def _journal_or_none(self) -> Optional[PersistenceJournal]:
+        if self._journal is None and self.journal_path:
+            self._journal = PersistenceJournal(self.journal_path)
+        return self._journal
+
+    def _spill_sync(self, records: List[dict]) -> None:
+        journal = self._journal_or_none()
+        if journal is None:
+            self.discarded += len(records)
+            logger.error("Discarding %d unwritten records (no PERSIST_JOURNAL_PATH)", len(records))
+            return
+        journal.append(records)
+        self.journal_depth = journal.count()
+
+    async def _spill(self, records: List[dict]) -> None:
+        if not records:
+            return
+        self.spilled += len(records)
+        try:
+            await asyncio.to_thread(self._spill_sync, records)
+        except Exception as e:
+            self.discarded += len(records)
+            logger.error("Failed to journal %d records: %s", len(records), e)
+
+    def _spill_later(self, records: List[dict]) -> None:
+        task = asyncio.create_task(self._spill(records))
+        self._spills.add(task)
+        task.add_done_callback(self._spills.discard)
+
+    async def replay(self) -> int:
+        """Write journaled records back to Appwrite; returns how many succeeded"""
+        journal = await asyncio.to_thread(self._journal_or_none)
+        if journal is None:
+            return 0
+        written = 0
+        while await appwrite.run(appwrite_registry.check_health):
+            records = await asyncio.to_thread(journal.take, self.batch_size)
+            if not records:
+                break
+            failed = await self._write_batch(records)
+            written += len(records) - len(failed)
+            retry = []
+            for record in failed:
+                record["replays"] = record.get("replays", 0) + 1
+                if record["replays"] >= self.max_replays:
+                    self.discarded += 1
+                    logger.error(
+                        "Discarding %s %s/%s after %d replays",
+                        record["op"], record["collection"], record["id"], record["replays"]
+                    )
+                else:
+                    retry.append(record)
+            await self._spill(retry)
+            if failed:
+                break
+        self.replayed += written
+        self.journal_depth = await asyncio.to_thread(journal.count)
+        return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await fill_batch(self.queue, self._batch, self.batch_size, self.flush_interval)
+            batch, self._batch = self._batch, []
+            await self._spill(await self._write_batch(batch))
+
+    async def _replay_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            if not self.journal_depth:
+                continue
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.warning("Journal replay failed: %s", e)
+
+    async def start(self) -> None:
+        if not self.enabled or self._tasks:
+            return
+        journal = await asyncio.to_thread(self._journal_or_none)
+        if journal is not None:
+            # Left over from a previous run or another worker
+            self.journal_depth = await asyncio.to_thread(journal.count)
+        self._tasks = [asyncio.create_task(self._flush_loop()), asyncio.create_task(self._replay_loop())]
+        if self.journal_depth:
+            logger.info("%d journaled records will be replayed to Appwrite", self.journal_depth)
+
+    async def stop(self) -> None:
+        """Write what is still queued (up to drain_timeout), journaling the rest"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        # Writes the flusher was in the middle of, plus everything queued
+        remaining = list(self._writing.values()) + self._batch
+        self._writing, self._batch = {}, []
+        while not self.queue.empty():
+            remaining.append(self.queue.get_nowait())
+        if remaining:
+            flush = asyncio.create_task(self._write_batch(remaining))
+            try:
+                remaining = await asyncio.wait_for(asyncio.shield(flush), self.drain_timeout)
+            except asyncio.TimeoutError:
+                flush.cancel()
+                try:
+                    await flush
+                except asyncio.CancelledError:
+                    pass
+                remaining = list(self._writing.values())
+                self._writing = {}
+            await self._spill(remaining)
+        if self._spills:
+            await asyncio.gather(*self._spills, return_exceptions=True)
+        if self._journal is not None:
+            await asyncio.to_thread(self._journal.close)
+            self._journal = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "depth": self.depth(),
+            "journal_depth": self.journal_depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+            "discarded": self.discarded,
+        }
+
+
+persistence = WriteBehindStore(
+    database_id=settings.APPWRITE_DATABASE_ID,
+    collections={
+        SALES: settings.APPWRITE_SALES_COLLECTION_ID,
+        RECORDINGS: settings.APPWRITE_RECORDINGS_COLLECTION_ID,
+    },
+    journal_path=settings.PERSIST_JOURNAL_PATH,
+    maxsize=settings.PERSIST_QUEUE_SIZE,
+    batch_size=settings.PERSIST_BATCH_SIZE,
+    flush_interval=settings.PERSIST_FLUSH_INTERVAL,
+    concurrency=settings.PERSIST_CONCURRENCY,
+    retry_policy=RetryPolicy(
+        max_attempts=settings.PERSIST_RETRY_ATTEMPTS,
+        base_delay=settings.PERSIST_RETRY_BASE_DELAY,
+        max_delay=settings.PERSIST_RETRY_MAX_DELAY,
+    ),
+    replay_interval=settings.PERSIST_REPLAY_INTERVAL,
+    max_replays=settings.PERSIST_MAX_REPLAYS,
+    drain_timeout=settings.PERSIST_DRAIN_TIMEOUT,
+)
+
+registry.callback("persistence_queue_depth", "Records waiting to be written to Appwrite", persistence.depth)
+registry.callback(
+    "persistence_journal_depth", "Records spilled to the local journal awaiting replay",
+    lambda: persistence.journal_depth,
+)
+registry.callback(
+    "persistence_records", "Write-behind records by outcome",
+    lambda: {
+        ("enqueued",): persistence.enqueued,
+        ("written",): persistence.written,
+        ("spilled",): persistence.spilled,
+        ("replayed",): persistence.replayed,
+        ("rejected",): persistence.rejected,
+        ("discarded",): persistence.discarded,
+    },
+    ("outcome",), type_name="counter",
+)
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def record_process_started(sales_process_id: str, user: User, lead: Lead) -> None:
+    persistence.enqueue(SALES, CREATE, sales_process_id, {
+        "sales_process_id": sales_process_id,
+        "status": "started",
+        "agent_id": user.external_id,
+        "lead_name": f"{lead.first_name} {lead.last_name}",
+        "lead_phone": lead.phone_mobile,
+        "created_at": _now(),
+    })
+
+
+def record_process_status(sales_process_id: str, status: str) -> None:
+    persistence.enqueue(SALES, UPDATE, sales_process_id, {"status": status, "updated_at": _now()})
+
+
+def record_recording(recording_id: str, sales_process_id: str, filename: str, recorded_at: datetime) -> None:
+    persistence.enqueue(RECORDINGS, CREATE, recording_id, {
+        "recording_id": recording_id,
+        "sales_process_id": sales_process_id,
+        "status": "url_generated",
+        "file_name": filename,
+        "recorded_at": recorded_at.isoformat(),
+    })
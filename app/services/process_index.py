@@ -0,0 +1,361 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.metrics import registry
+from app.utils.session import session_manager
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Move a process to a new status and re-file it under the matching status
+# index in one round trip. The status key is derived from the stored status,
+# which is fine for the single Redis instance this service runs against.
+UPDATE_STATUS_SCRIPT = """
+local old = redis.call('HGET', KEYS[1], 'status')
+if not old then
+    return 0
+end
+if old ~= ARGV[1] then
+    local created = redis.call('HGET', KEYS[1], 'created_at')
+    redis.call('ZREM', ARGV[3] .. old, ARGV[4])
+    redis.call('ZADD', ARGV[3] .. ARGV[1], created, ARGV[4])
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'updated_at', ARGV[2])
+return 1
+"""
+
+ALL_INDEX = "processes:all"
+AGENT_INDEX = "processes:agent:"
+CAMPAIGN_INDEX = "processes:campaign:"
+STATUS_INDEX = "processes:status:"
+
+FIELDS = ("sales_process_id", "account_id", "agent_id", "campaign_code", "status", "created_at", "updated_at")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: float, sales_process_id: str) -> str:
+    return f"{created_at!r}:{sales_process_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    score, sep, sales_process_id = cursor.partition(":")
+    try:
+        if not sep or not sales_process_id:
+            raise ValueError
+        return float(score), sales_process_id
+    except ValueError:
+        raise InvalidCursor("Malformed cursor")
+
+
+def _encode(record: Dict[str, Any]) -> Dict[str, str]:
+    return {field: repr(value) if isinstance(value, float) else value for field, value in record.items()}
+
+
+def _decode(fields: Dict[str, str]) -> Dict[str, Any]:
+    record = {field: fields.get(field) for field in FIELDS}
+    record["created_at"] = float(record["created_at"])
+    if record["updated_at"] is not None:
+        record["updated_at"] = float(record["updated_at"])
+    return record
+
+
+class ProcessQuery:
+    """Filters for a listing; ``statuses`` and ``account_id`` may be combined with any index"""
+
+    def __init__(
+        self,
+        agent_id: Optional[str] = None,
+        campaign_code: Optional[str] = None,
+        statuses: Sequence[str] = (),
+        account_id: Optional[str] = None,
+        created_after: Optional[float] = None,
+        created_before: Optional[float] = None,
+    ):
+        self.agent_id = agent_id
+        self.campaign_code = campaign_code
+        self.statuses = frozenset(statuses)
+        self.account_id = account_id
+        self.created_after = created_after
+        self.created_before = created_before
+
+    def index_key(self) -> str:
+        """The most selective sorted set that contains every match"""
+        if self.agent_id:
+            return AGENT_INDEX + self.agent_id
+        if self.campaign_code:
+            return CAMPAIGN_INDEX + self.campaign_code
+        if len(self.statuses) == 1:
+            return STATUS_INDEX + next(iter(self.statuses))
+        return ALL_INDEX
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        return (
+            (not self.agent_id or record["agent_id"] == self.agent_id)
+            and (not self.campaign_code or record["campaign_code"] == self.campaign_code)
+            and (not self.statuses or record["status"] in self.statuses)
+            and (not self.account_id or record["account_id"] == self.account_id)
+            and (self.created_after is None or record["created_at"] >= self.created_after)
+            and (self.created_before is None or record["created_at"] <= self.created_before)
+        )
+
+
+class ProcessIndex:
+    """Local read model of the sales processes this service started.
+
+    Built from the results of create/continue/stop, so listings never call
+    DTech. With Redis each process is a ``process:{spid}`` hash and is
+    filed, scored by creation time, in sorted sets for all processes, its
+    agent (``User.external_id``), its campaign and its current status.
+    A listing walks the most selective of those newest-first and checks
+    the remaining filters on the hashes, examining at most ``max_scan``
+    entries per page. Pages are keyed by ``(created_at, spid)`` cursors,
+    so they stay stable while new processes arrive. Entries older than
+    ``retention`` seconds are trimmed on write and expire with their hash.
+    Without Redis a bounded in-process copy with the same indexes is used.
+    """
+
+    def __init__(
+        self,
+        retention: float,
+        max_entries: int = 10000,
+        max_scan: int = 2000,
+        redis_getter: Callable[[], Any] = lambda: None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.retention = retention
+        self.max_entries = max_entries
+        self.max_scan = max_scan
+        self._redis_getter = redis_getter
+        self._clock = clock
+        self._status_script = None
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._indexes: Dict[str, Set[str]] = {}
+        self.writes = 0
+        self.write_failures = 0
+        self.queries = 0
+        self.scanned = 0
+
+    @staticmethod
+    def _key(sales_process_id: str) -> str:
+        return f"process:{sales_process_id}"
+
+    @staticmethod
+    def _index_keys(record: Dict[str, Any]) -> List[str]:
+        return [
+            ALL_INDEX,
+            AGENT_INDEX + record["agent_id"],
+            CAMPAIGN_INDEX + record["campaign_code"],
+            STATUS_INDEX + record["status"],
+        ]
+
+    async def record_started(
+        self, sales_process_id: str, account_id: str, agent_id: str, campaign_code: str
+    ) -> None:
+        """File a newly created process under every index"""
+        now = self._clock()
+        record = {
+            "sales_process_id": sales_process_id,
+            "account_id": account_id,
+            "agent_id": agent_id,
+            "campaign_code": campaign_code,
+            "status": "started",
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.writes += 1
+        redis = self._redis_getter()
+        if redis is None:
+            self._memory_add(record)
+            return
+        cutoff = now - self.retention
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self._key(sales_process_id), mapping=_encode(record))
+                pipe.expire(self._key(sales_process_id), int(self.retention))
+                for index in self._index_keys(record):
+                    pipe.zadd(index, {sales_process_id: now})
+                    pipe.zremrangebyscore(index, "-inf", f"({cutoff!r}")
+                    pipe.expire(index, int(self.retention))
+                await pipe.execute()
+        except RedisError as e:
+            self.write_failures += 1
+            logger.warning("Could not index sales process %s: %s", sales_process_id, e)
+
+    async def record_status(self, sales_process_id: str, status: str) -> None:
+        """Move a known process to ``status``; processes started elsewhere are ignored"""
+        now = self._clock()
+        self.writes += 1
+        redis = self._redis_getter()
+        if redis is None:
+            self._memory_set_status(sales_process_id, status, now)
+            return
+        try:
+            if self._status_script is None or self._status_script.registered_client is not redis:
+                self._status_script = redis.register_script(UPDATE_STATUS_SCRIPT)
+            await self._status_script(
+                keys=[self._key(sales_process_id)],
+                args=[status, repr(now), STATUS_INDEX, sales_process_id],
+            )
+        except RedisError as e:
+            self.write_failures += 1
+            logger.warning("Could not update indexed status of %s: %s", sales_process_id, e)
+
+    async def query(
+        self, query: ProcessQuery, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return up to ``limit`` matching processes, newest first, and the next cursor.
+
+        The next cursor is None once the index is exhausted. A page can be
+        shorter than ``limit`` (even empty) with a cursor when the scan
+        budget ran out first.
+        """
+        self.queries += 1
+        after = decode_cursor(cursor) if cursor else None
+        if self._redis_getter() is None:
+            return self._memory_query(query, limit, after)
+        return await self._redis_query(query, limit, after)
+
+    async def _redis_query(
+        self, query: ProcessQuery, limit: int, after: Optional[Tuple[float, str]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        redis = self._redis_getter()
+        index = query.index_key()
+        floor = max(query.created_after or 0.0, self._clock() - self.retention)
+        items: List[Dict[str, Any]] = []
+        scanned = 0
+        # Entries sharing the cursor's score but sorting before it are read
+        # separately; the score range below starts strictly under the cursor
+        # (ZREVRANGEBYSCORE orders equal scores by member, descending)
+        ties_pending = after is not None and (query.created_before is None or query.created_before >= after[0])
+        while len(items) < limit and scanned < self.max_scan:
+            chunk = min(self.max_scan - scanned, (limit - len(items)) * 2)
+            if ties_pending:
+                score = repr(after[0])
+                ties = await redis.zrevrangebyscore(index, score, score, withscores=True)
+                ties = [(m, s) for m, s in ties if m < after[1]]
+                members = ties[:chunk]
+                ties_pending = len(ties) > chunk
+                if not members:
+                    continue
+            else:
+                if after is not None and (query.created_before is None or query.created_before >= after[0]):
+                    top = f"({after[0]!r}"
+                elif query.created_before is not None:
+                    top = repr(query.created_before)
+                else:
+                    top = "+inf"
+                members = await redis.zrevrangebyscore(index, top, floor, start=0, num=chunk, withscores=True)
+                if not members:
+                    return items, None
+                # A full batch may have cut a run of equal scores short
+                ties_pending = len(members) == chunk
+            async with redis.pipeline(transaction=False) as pipe:
+                for member, _ in members:
+                    pipe.hgetall(self._key(member))
+                hashes = await pipe.execute()
+            for (member, score), fields in zip(members, hashes):
+                scanned += 1
+                self.scanned += 1
+                after = (score, member)
+                # A missing hash has expired; its index entry is trimmed later
+                if not fields:
+                    continue
+                record = _decode(fields)
+                if query.matches(record):
+                    items.append(record)
+                    if len(items) == limit:
+                        break
+        # Out of budget or page full: there may be more, so hand back a cursor
+        return items, encode_cursor(*after) if after is not None else None
+
+    def _memory_add(self, record: Dict[str, Any]) -> None:
+        sales_process_id = record["sales_process_id"]
+        self._memory_remove(sales_process_id)
+        self._records[sales_process_id] = record
+        for index in self._index_keys(record):
+            self._indexes.setdefault(index, set()).add(sales_process_id)
+        while len(self._records) > self.max_entries:
+            self._memory_remove(next(iter(self._records)))
+
+    def _memory_remove(self, sales_process_id: str) -> None:
+        record = self._records.pop(sales_process_id, None)
+        if record is None:
+            return
+        for index in self._index_keys(record):
+            members = self._indexes.get(index)
+            if members is not None:
+                members.discard(sales_process_id)
+                if not members:
+                    del self._indexes[index]
+
+    def _memory_set_status(self, sales_process_id: str, status: str, now: float) -> None:
+        record = self._records.get(sales_process_id)
+        if record is None:
+            return
+        if record["status"] != status:
+            old = STATUS_INDEX + record["status"]
+            self._indexes[old].discard(sales_process_id)
+            if not self._indexes[old]:
+                del self._indexes[old]
+            self._indexes.setdefault(STATUS_INDEX + status, set()).add(sales_process_id)
+        record["status"] = status
+        record["updated_at"] = now
+
+    def _memory_query(
+        self, query: ProcessQuery, limit: int, after: Optional[Tuple[float, str]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        floor = self._clock() - self.retention
+        candidates = [
+            self._records[sales_process_id]
+            for sales_process_id in self._indexes.get(query.index_key(), ())
+        ]
+        candidates = [
+            record for record in candidates
+            if record["created_at"] >= floor and query.matches(record)
+            and (after is None or (record["created_at"], record["sales_process_id"]) < after)
+        ]
+        candidates.sort(key=lambda record: (record["created_at"], record["sales_process_id"]), reverse=True)
+        items = [dict(record) for record in candidates[:limit]]
+        self.scanned += len(candidates)
+        if len(candidates) <= limit:
+            return items, None
+        return items, encode_cursor(items[-1]["created_at"], items[-1]["sales_process_id"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._redis_getter() is not None else "memory",
+            "memory_entries": len(self._records),
+            "writes": self.writes,
+            "write_failures": self.write_failures,
+            "queries": self.queries,
+            "scanned": self.scanned,
+        }
+
+
+process_index = ProcessIndex(
+    retention=settings.PROCESS_INDEX_RETENTION,
+    max_entries=settings.PROCESS_INDEX_MAX_ENTRIES,
+    max_scan=settings.PROCESS_LIST_MAX_SCAN,
+    redis_getter=lambda: session_manager.redis,
+)
+
+registry.callback(
+    "process_index_memory_entries", "Sales processes held by the in-memory read model",
+    lambda: process_index.stats()["memory_entries"],
+)
+registry.callback(
+    "process_index_operations", "Read model writes, failed writes and listing queries",
+    lambda: {
+        ("write",): process_index.writes,
+        ("write_failure",): process_index.write_failures,
+        ("query",): process_index.queries,
+    },
+    ("operation",), type_name="counter",
+)
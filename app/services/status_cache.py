@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.metrics import registry
+from app.services.dtech_service import get_status
+from app.utils.memory_store import MemoryStore
+from app.utils.session import session_manager
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+StatusKey = Tuple[str, str]
+
+
+class StatusCache:
+    """Short-TTL cache in front of DTech status lookups.
+
+    Fresh entries (younger than ``ttl``) are served directly. Entries within
+    the ``stale_ttl`` grace window are served immediately while one
+    background refresh runs. Concurrent misses for the same process share a
+    single upstream call. With the ``redis`` backend the cache is shared by
+    every worker; otherwise each process keeps its own bounded store.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, str], Awaitable[Dict[str, Any]]],
+        ttl: float,
+        stale_ttl: float,
+        backend: str = "memory",
+        max_entries: int = 10000,
+        redis_getter: Callable[[], Any] = lambda: None,
+    ):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self._memory = MemoryStore(max_entries=max_entries)
+        self._redis_getter = redis_getter
+        self._inflight: Dict[StatusKey, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_errors = 0
+
+    def _redis(self):
+        return self._redis_getter() if self.backend == "redis" else None
+
+    @staticmethod
+    def _cache_key(key: StatusKey) -> str:
+        return f"status:{key[0]}:{key[1]}"
+
+    async def _load(self, key: StatusKey) -> Optional[Tuple[float, Dict[str, Any]]]:
+        redis = self._redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(self._cache_key(key))
+            except RedisError as e:
+                logger.warning("Status cache read failed: %s", e)
+                raw = None
+        else:
+            raw = self._memory.get(self._cache_key(key))
+        if not raw:
+            return None
+        envelope = json.loads(raw)
+        return envelope["fetched_at"], envelope["value"]
+
+    async def _store(self, key: StatusKey, value: Dict[str, Any]) -> None:
+        raw = json.dumps({"fetched_at": time.time(), "value": value})
+        lifetime = self.ttl + self.stale_ttl
+        redis = self._redis()
+        if redis is not None:
+            try:
+                await redis.set(self._cache_key(key), raw, px=max(1, int(lifetime * 1000)))
+            except RedisError as e:
+                logger.warning("Status cache write failed: %s", e)
+        else:
+            self._memory.set(self._cache_key(key), raw, lifetime)
+
+    async def _refresh(self, key: StatusKey) -> Dict[str, Any]:
+        value = await self._fetch(*key)
+        if self.ttl > 0:
+            await self._store(key, value)
+        return value
+
+    def _single_flight(self, key: StatusKey) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.create_task(self._refresh(key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return task
+
+    def _finish(self, key: StatusKey, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Waiters see the exception; count it for background refreshes
+            self.refresh_errors += 1
+
+    async def get(self, spid: str, account_id: str) -> Dict[str, Any]:
+        """Return the status of a sales process, from cache when possible"""
+        key = (spid, account_id)
+        if self.ttl > 0:
+            cached = await self._load(key)
+            if cached is not None:
+                fetched_at, value = cached
+                age = time.time() - fetched_at
+                if age < self.ttl:
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    self._single_flight(key)
+                    return value
+        self.misses += 1
+        # Shield so a disconnecting client doesn't cancel the shared call
+        return await asyncio.shield(self._single_flight(key))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": "redis" if self._redis() is not None else "memory",
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refresh_errors": self.refresh_errors,
+            "inflight": len(self._inflight),
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+async def _fetch_status(spid: str, account_id: str) -> Dict[str, Any]:
+    return (await get_status(spid, account_id)).model_dump(mode="json")
+
+
+status_cache = StatusCache(
+    fetch=_fetch_status,
+    ttl=settings.STATUS_CACHE_TTL,
+    stale_ttl=settings.STATUS_CACHE_STALE_TTL,
+    backend=settings.STATUS_CACHE_BACKEND,
+    max_entries=settings.STATUS_CACHE_MAX_ENTRIES,
+    redis_getter=lambda: session_manager.redis,
+)
+
+registry.callback(
+    "status_cache_lookups", "DTech status cache lookups by result",
+    lambda: {
+        ("hit",): status_cache.hits,
+        ("stale_hit",): status_cache.stale_hits,
+        ("miss",): status_cache.misses,
+        ("coalesced",): status_cache.coalesced,
+    },
+    ("result",), type_name="counter",
+)
+registry.callback(
+    "status_cache_inflight", "DTech status refreshes in flight", lambda: len(status_cache._inflight)
+)
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+
+from redis.exceptions import RedisError
+
+from app.core.metrics import registry
+from app.utils.memory_store import MemoryStore
+from app.utils.session import session_manager
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Apply a field update to an upload hash and publish the resulting state in
+# one round trip. Returns 0 for an unknown upload and -1 once it has
+# finished, so late or duplicate reports can't reopen it.
+UPDATE_UPLOAD_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then
+    return 0
+end
+if status == 'completed' or status == 'failed' then
+    return -1
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+local flat = redis.call('HGETALL', KEYS[1])
+local state = {}
+for i = 1, #flat, 2 do
+    state[flat[i]] = flat[i + 1]
+end
+local encoded = cjson.encode(state)
+redis.call('PUBLISH', KEYS[2], encoded)
+return encoded
+"""
+
+
+class UploadNotFound(Exception):
+    pass
+
+
+class UploadFinished(Exception):
+    """The upload already completed or failed"""
+
+
+def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+    return {field: str(value) for field, value in fields.items()}
+
+
+def _decode(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Hash fields come back as strings; restore the numeric ones"""
+    state = dict(state)
+    for field, cast in (("progress", float), ("version", int)):
+        if field in state:
+            state[field] = cast(state[field])
+    return state
+
+
+class UploadTracker:
+    """Recording upload state, with every transition pushed to watchers.
+
+    Each upload is a Redis hash updated field by field, so a progress
+    report never rewrites the rest of the record. Updates bump a
+    ``version`` and publish the new state on ``upload-events:{id}``; one
+    pattern subscription per worker fans those out to its local watchers,
+    so a report handled by any worker reaches every open event stream.
+    Without Redis the state lives in a bounded in-process store and
+    updates are fanned out directly.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        keepalive: float,
+        max_entries: int = 10000,
+        redis_getter: Callable[[], Any] = lambda: None,
+        queue_size: int = 16,
+    ):
+        self.ttl = ttl
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self._memory = MemoryStore(max_entries=max_entries)
+        self._redis_getter = redis_getter
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self._update_script = None
+        self._listener: Optional[asyncio.Task] = None
+        self.updates = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @staticmethod
+    def _key(upload_id: str) -> str:
+        return f"upload:{upload_id}"
+
+    @staticmethod
+    def _channel(upload_id: str) -> str:
+        return f"upload-events:{upload_id}"
+
+    async def create(self, upload_id: str, **fields: Any) -> Dict[str, Any]:
+        """Store the initial state of an upload"""
+        state = {**fields, "upload_id": upload_id, "version": 1}
+        redis = self._redis_getter()
+        if redis is not None:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self._key(upload_id), mapping=_encode(state))
+                pipe.expire(self._key(upload_id), int(self.ttl))
+                await pipe.execute()
+        else:
+            self._memory.set(self._key(upload_id), json.dumps(state), self.ttl)
+        return state
+
+    async def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        redis = self._redis_getter()
+        if redis is not None:
+            state = await redis.hgetall(self._key(upload_id))
+            return _decode(state) if state else None
+        raw = self._memory.get(self._key(upload_id))
+        return json.loads(raw) if raw else None
+
+    async def update(self, upload_id: str, **fields: Any) -> Dict[str, Any]:
+        """Set some fields of an upload and notify its watchers.
+
+        Fields passed as ``None`` are left untouched. Raises UploadNotFound
+        for unknown or expired uploads and UploadFinished once the upload
+        has completed or failed.
+        """
+        fields = {field: value for field, value in fields.items() if value is not None}
+        redis = self._redis_getter()
+        if redis is not None:
+            if self._update_script is None or self._update_script.registered_client is not redis:
+                self._update_script = redis.register_script(UPDATE_UPLOAD_SCRIPT)
+            args = [int(self.ttl)]
+            for field, value in _encode(fields).items():
+                args += [field, value]
+            result = await self._update_script(
+                keys=[self._key(upload_id), self._channel(upload_id)], args=args
+            )
+            if result == 0:
+                raise UploadNotFound(upload_id)
+            if result == -1:
+                raise UploadFinished(upload_id)
+            state = _decode(json.loads(result))
+        else:
+            raw = self._memory.get(self._key(upload_id))
+            if raw is None:
+                raise UploadNotFound(upload_id)
+            state = json.loads(raw)
+            if state.get("status") in TERMINAL_STATUSES:
+                raise UploadFinished(upload_id)
+            state.update(fields)
+            state["version"] += 1
+            self._memory.set(self._key(upload_id), json.dumps(state), self.ttl)
+            self._dispatch(upload_id, state)
+        self.updates += 1
+        return state
+
+    def _dispatch(self, upload_id: str, state: Dict[str, Any]) -> None:
+        for queue in self._watchers.get(upload_id, ()):
+            if queue.full():
+                # States are full snapshots; a slow watcher only needs the latest
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(state)
+            self.delivered += 1
+
+    async def watch(self, upload_id: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the upload's current state, then each newer one until it finishes.
+
+        ``None`` is yielded after ``keepalive`` seconds without a change so
+        the caller can keep its connection alive. Every quiet period also
+        re-reads the record, which picks up anything missed while pub/sub
+        was down and ends the stream once the upload expires.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._watchers.setdefault(upload_id, set()).add(queue)
+        try:
+            # Registered before the first read, so nothing published in between is lost
+            state = await self.get(upload_id)
+            version = 0
+            while state is not None:
+                if state["version"] > version:
+                    version = state["version"]
+                    yield state
+                    if state.get("status") in TERMINAL_STATUSES:
+                        return
+                try:
+                    state = await asyncio.wait_for(queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    state = await self.get(upload_id)
+        finally:
+            watchers = self._watchers.get(upload_id)
+            if watchers is not None:
+                watchers.discard(queue)
+                if not watchers:
+                    del self._watchers[upload_id]
+
+    async def _listen(self) -> None:
+        """Fan upload states published by any worker out to local watchers"""
+        prefix = len(self._channel(""))
+        while True:
+            redis = self._redis_getter()
+            if redis is None:
+                return
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(self._channel("*"))
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None and message["type"] == "pmessage":
+                        self._dispatch(message["channel"][prefix:], _decode(json.loads(message["data"])))
+            except (RedisError, OSError) as e:
+                logger.warning("Upload event subscription lost, resubscribing: %s", e)
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    async def start(self) -> None:
+        if self._redis_getter() is not None and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def watcher_count(self) -> int:
+        return sum(len(watchers) for watchers in self._watchers.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._redis_getter() is not None else "memory",
+            "watchers": self.watcher_count(),
+            "watched_uploads": len(self._watchers),
+            "updates": self.updates,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+upload_tracker = UploadTracker(
+    ttl=settings.UPLOAD_STATUS_TTL,
+    keepalive=settings.UPLOAD_EVENTS_KEEPALIVE,
+    max_entries=settings.UPLOAD_STATUS_MAX_ENTRIES,
+    redis_getter=lambda: session_manager.redis,
+)
+
+registry.callback(
+    "upload_event_watchers", "Open upload event streams in this worker",
+    upload_tracker.watcher_count,
+)
+registry.callback(
+    "upload_events", "Upload states pushed to local watchers",
+    lambda: {
+        ("delivered",): upload_tracker.delivered,
+        ("dropped",): upload_tracker.dropped,
+    },
+    ("outcome",), type_name="counter",
+)
@@ -2,58 +2,85 @@ import datetime
 import hashlib
 import hmac
 import urllib.parse
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+EMPTY_PAYLOAD_HASH = hashlib.sha256(b'').hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def _split_url(url: str) -> Tuple[str, str, str]:
+    """Return (host, canonical_uri, canonical_querystring) for a URL."""
+    parsed_url = urllib.parse.urlparse(url)
+    return parsed_url.netloc, parsed_url.path or '/', parsed_url.query
+
 
 class AWSRequestSigner:
     """AWS Signature Version 4 authentication."""
-    
+
+    # Signing keys change once per UTC day; a couple of entries covers the
+    # midnight rollover without growing unbounded.
+    _MAX_CACHED_KEYS = 4
+
     def __init__(self, access_key: str, secret_key: str, region: str = 'eu-west-1', service: str = 'execute-api'):
         self.access_key = access_key
         self.secret_key = secret_key
         self.region = region
         self.service = service
+        self._secret_key_bytes = f'AWS4{secret_key}'.encode('utf-8')
+        self._scope_suffix = f"/{region}/{service}/aws4_request"
+        self._signing_keys: Dict[Tuple[str, str, str], bytes] = {}
 
     def _sign(self, key: bytes, msg: str) -> bytes:
         """Create HMAC-SHA256 signature."""
         return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
 
     def _get_signature_key(self, date_stamp: str) -> bytes:
-        """Generate the signing key for AWS signature v4."""
-        k_date = self._sign(f'AWS4{self.secret_key}'.encode('utf-8'), date_stamp)
-        k_region = self._sign(k_date, self.region)
-        k_service = self._sign(k_region, self.service)
-        k_signing = self._sign(k_service, 'aws4_request')
+        """Return the signing key for AWS signature v4, derived once per day."""
+        cache_key = (date_stamp, self.region, self.service)
+        k_signing = self._signing_keys.get(cache_key)
+        if k_signing is None:
+            k_date = self._sign(self._secret_key_bytes, date_stamp)
+            k_region = self._sign(k_date, self.region)
+            k_service = self._sign(k_region, self.service)
+            k_signing = self._sign(k_service, 'aws4_request')
+            if len(self._signing_keys) >= self._MAX_CACHED_KEYS:
+                self._signing_keys.clear()
+            self._signing_keys[cache_key] = k_signing
         return k_signing
 
     def _get_canonical_headers(self, headers: Dict[str, str]) -> tuple[str, str]:
         """Create canonical headers and signed headers string."""
-        canonical_headers = []
-        for key, value in sorted(headers.items()):
-            canonical_headers.append(f"{key.lower()}:{value.strip()}")
-        return ('\n'.join(canonical_headers) + '\n', ';'.join(sorted(key.lower() for key in headers)))
+        items = sorted((key.lower(), value.strip()) for key, value in headers.items())
+        canonical_headers = ''.join(f"{key}:{value}\n" for key, value in items)
+        return canonical_headers, ';'.join(key for key, _ in items)
 
     def sign_request(
         self,
         method: str,
         url: str,
-        data: Optional[str] = None,
-        headers: Optional[Dict[str, str]] = None
+        data: Optional[Union[str, bytes]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timestamp: Optional[datetime.datetime] = None
     ) -> Dict[str, str]:
-        """Sign an HTTP request with AWS Signature Version 4."""
-        
+        """Sign an HTTP request with AWS Signature Version 4.
+
+        ``data`` must be exactly the bytes (or text) that will go on the wire.
+        ``timestamp`` defaults to now and is only needed to re-derive an
+        existing signature.
+        """
+
         # Initialize headers if None
         headers = headers or {}
-        
+
         # Parse URL
-        parsed_url = urllib.parse.urlparse(url)
-        host = parsed_url.netloc
-        canonical_uri = parsed_url.path or '/'
-        canonical_querystring = parsed_url.query
+        host, canonical_uri, canonical_querystring = _split_url(url)
 
         # Prepare dates
-        t = datetime.datetime.utcnow()
+        t = timestamp or datetime.datetime.now(datetime.timezone.utc)
         amz_date = t.strftime('%Y%m%dT%H%M%SZ')
-        date_stamp = t.strftime('%Y%m%d')
+        date_stamp = amz_date[:8]
 
         # Add required headers
         headers.update({
@@ -65,7 +92,12 @@ class AWSRequestSigner:
         canonical_headers, signed_headers = self._get_canonical_headers(headers)
 
         # Create payload hash
-        payload_hash = hashlib.sha256((data or '').encode('utf-8')).hexdigest()
+        if not data:
+            payload_hash = EMPTY_PAYLOAD_HASH
+        else:
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            payload_hash = hashlib.sha256(data).hexdigest()
 
         # Create canonical request
         canonical_request = '\n'.join([
@@ -78,10 +110,9 @@ class AWSRequestSigner:
         ])
 
         # Create string to sign
-        algorithm = 'AWS4-HMAC-SHA256'
-        credential_scope = f"{date_stamp}/{self.region}/{self.service}/aws4_request"
+        credential_scope = date_stamp + self._scope_suffix
         string_to_sign = '\n'.join([
-            algorithm,
+            ALGORITHM,
             amz_date,
             credential_scope,
             hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
@@ -93,11 +124,11 @@ class AWSRequestSigner:
 
         # Create authorization header
         authorization_header = (
-            f"{algorithm} Credential={self.access_key}/{credential_scope}, "
+            f"{ALGORITHM} Credential={self.access_key}/{credential_scope}, "
             f"SignedHeaders={signed_headers}, Signature={signature}"
         )
 
         # Add authorization header to request headers
         headers['Authorization'] = authorization_header
-        
+
         return headers
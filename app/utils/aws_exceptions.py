@@ -1,5 +1,8 @@
+import math
 from fastapi import HTTPException
-from httpx import HTTPError
+from httpx import HTTPError, TimeoutException, TransportError
+from app.core.rate_limit import RateLimitExceeded
+from app.core.resilience import CircuitOpenError
 import json
 from typing import Dict, Any
 
@@ -24,6 +27,22 @@ def handle_dtech_error(error: Exception) -> HTTPException:
             status_code=401,
             detail="Authentication failed with DTech API"
         )
+    elif isinstance(error, CircuitOpenError):
+        return HTTPException(
+            status_code=503,
+            detail="DTech API is unavailable, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_in)))}
+        )
+    elif isinstance(error, RateLimitExceeded):
+        return HTTPException(
+            status_code=429,
+            detail="Too many DTech requests in flight, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_in)))}
+        )
+    elif isinstance(error, TimeoutException):
+        return HTTPException(status_code=504, detail="Timed out waiting for DTech API")
+    elif isinstance(error, TransportError):
+        return HTTPException(status_code=502, detail=f"Could not reach DTech API: {error}")
     elif isinstance(error, HTTPError):
         # Try to parse the error response if available
         response = getattr(error, "response", None)
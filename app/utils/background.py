@@ -1,19 +1,259 @@
-from fastapi import BackgroundTasks
+import asyncio
+import json
+import logging
 import smtplib
+import time
+from collections import Counter
+from datetime import datetime
 from email.message import EmailMessage
+from typing import List, Optional
+
+from fastapi import BackgroundTasks
+
+from app.core.metrics import registry
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+async def fill_batch(queue: asyncio.Queue, batch: list, max_items: int, interval: float) -> None:
+    """Wait for one item, then append more to ``batch`` until ``interval`` passes or it holds ``max_items``.
+
+    Items are appended as they arrive, so an owner that keeps ``batch``
+    can still flush what was collected if this is cancelled.
+    """
+    batch.append(await queue.get())
+    deadline = time.monotonic() + interval
+    while len(batch) < max_items:
+        if not queue.empty():
+            batch.append(queue.get_nowait())
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Not wait_for: on 3.11 it can swallow a cancel that races with
+        # get() completing, which would leave stop() waiting a full interval
+        getter = asyncio.ensure_future(queue.get())
+        try:
+            done, _ = await asyncio.wait({getter}, timeout=remaining)
+        except asyncio.CancelledError:
+            if not getter.cancel():
+                batch.append(getter.result())
+            raise
+        if not done:
+            getter.cancel()
+            break
+        batch.append(getter.result())
+
+
+class NotificationQueue:
+    """In-process queue of notification events sent as periodic digests.
+
+    Events are queued without blocking the request. A single sender task
+    drains the queue every ``batch_interval`` seconds (or as soon as
+    ``max_batch`` events are waiting) and mails one digest over a reused
+    SMTP connection, so the threadpool is touched once per digest rather
+    than once per event. When the queue is full, ``overflow_policy``
+    decides whether the new event is dropped, the oldest one is dropped,
+    or the publisher waits for room (backpressure).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        overflow_policy: str = "drop_oldest",
+        batch_interval: float = 60.0,
+        max_batch: int = 500,
+        smtp_host: str = "localhost",
+        smtp_port: int = 25,
+        sender: str = "noreply@dtech.com",
+        recipient: str = "admin@dtech.com",
+        block_timeout: float = 5.0,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflow_policy = overflow_policy
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.sender = sender
+        self.recipient = recipient
+        self.block_timeout = block_timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[dict] = []
+        self.published = 0
+        self.dropped = 0
+        self.sent_events = 0
+        self.sent_digests = 0
+        self.send_failures = 0
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def publish(self, event: dict) -> bool:
+        """Queue an event without waiting; returns False if it was dropped"""
+        event = {**event, "timestamp": datetime.now().isoformat()}
+        if self.queue.full():
+            if self.overflow_policy == "drop_oldest":
+                self.queue.get_nowait()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+        self.queue.put_nowait(event)
+        self.published += 1
+        return True
+
+    async def publish_wait(self, event: dict) -> bool:
+        """Queue an event, waiting up to block_timeout for room"""
+        event = {**event, "timestamp": datetime.now().isoformat()}
+        try:
+            await asyncio.wait_for(self.queue.put(event), timeout=self.block_timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            return False
+        self.published += 1
+        return True
+
+    async def _fill_batch(self) -> None:
+        """Wait for the first event, then collect until interval or max_batch.
+
+        Events are held on the instance so stop() can flush a batch that
+        was still being collected.
+        """
+        await fill_batch(self.queue, self._batch, self.max_batch, self.batch_interval)
+
+    def _drain_nowait(self) -> List[dict]:
+        batch, self._batch = self._batch, []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            await self._fill_batch()
+            batch, self._batch = self._batch, []
+            await self._deliver(batch)
+
+    async def _deliver(self, batch: List[dict]) -> None:
+        try:
+            await asyncio.to_thread(self._send_digest, batch)
+        except Exception as e:
+            self.send_failures += 1
+            logger.warning("Failed to send notification digest of %d events: %s", len(batch), e)
+            return
+        self.sent_events += len(batch)
+        self.sent_digests += 1
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except smtplib.SMTPException:
+                self._close_connection()
+        self._smtp = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=10)
+        return self._smtp
+
+    def _close_connection(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def build_digest(self, batch: List[dict]) -> EmailMessage:
+        counts = Counter(event.get("event", "unknown") for event in batch)
+        summary = ", ".join(f"{name} x{count}" for name, count in counts.most_common())
+        msg = EmailMessage()
+        msg.set_content("\n".join(json.dumps(event, default=str) for event in batch))
+        msg["Subject"] = f"DTech Events: {len(batch)} events ({summary})"
+        msg["From"] = self.sender
+        msg["To"] = self.recipient
+        return msg
+
+    def _send_digest(self, batch: List[dict]) -> None:
+        msg = self.build_digest(batch)
+        try:
+            self._connection().send_message(msg)
+        except (smtplib.SMTPException, OSError):
+            self._close_connection()
+            raise
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the sender, flushing whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        remaining = self._drain_nowait()
+        if remaining:
+            await self._deliver(remaining)
+        await asyncio.to_thread(self._close_connection)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "published": self.published,
+            "dropped": self.dropped,
+            "sent_events": self.sent_events,
+            "sent_digests": self.sent_digests,
+            "send_failures": self.send_failures,
+        }
+
+
+notifier = NotificationQueue(
+    maxsize=settings.NOTIFY_QUEUE_SIZE,
+    overflow_policy=settings.NOTIFY_OVERFLOW_POLICY,
+    batch_interval=settings.NOTIFY_BATCH_INTERVAL,
+    max_batch=settings.NOTIFY_MAX_BATCH,
+    smtp_host=settings.SMTP_HOST,
+    smtp_port=settings.SMTP_PORT,
+    sender=settings.NOTIFY_FROM,
+    recipient=settings.NOTIFY_TO,
+)
+
+registry.callback("notification_queue_depth", "Notification events waiting for a digest", notifier.depth)
+registry.callback(
+    "notification_events", "Notification events by outcome",
+    lambda: {
+        ("published",): notifier.published,
+        ("dropped",): notifier.dropped,
+        ("sent",): notifier.sent_events,
+    },
+    ("outcome",), type_name="counter",
+)
+
 
 def run_background_tasks(background_tasks: BackgroundTasks, data: dict):
-    background_tasks.add_task(send_email_notification, data)
-
-def send_email_notification(data: dict):
-    msg = EmailMessage()
-    msg.set_content(f"Background Event Triggered: {data}")
-    msg["Subject"] = f"DTech Event: {data.get('event')}"
-    msg["From"] = "noreply@dtech.com"
-    msg["To"] = "admin@dtech.com"
-
-    try:
-        with smtplib.SMTP("localhost") as smtp:
-            smtp.send_message(msg)
-    except Exception as e:
-        print("Email error:", e)
+    """Queue a notification event for the next digest email"""
+    if notifier.overflow_policy == "block":
+        # Wait for room after the response is sent, not in the request path
+        background_tasks.add_task(notifier.publish_wait, data)
+    else:
+        notifier.publish(data)
+
+
+async def notify(data: dict) -> None:
+    """Queue a notification event from a long-running coroutine.
+
+    Under the block policy this waits for room, so bulk producers are
+    slowed down instead of piling up deferred tasks.
+    """
+    if notifier.overflow_policy == "block":
+        await notifier.publish_wait(data)
+    else:
+        notifier.publish(data)
@@ -1,25 +1,75 @@
+import asyncio
 import base64
 import hashlib
+import mmap
+import os
 from pathlib import Path
+from typing import AsyncIterator, Optional
+
+# Large reads keep syscall and hashing overhead low for long call
+# recordings while still bounding memory per upload.
+CHUNK_SIZE = 1024 * 1024
+# Files at least this large are hashed through mmap, which avoids copying
+# each chunk into a Python bytes object.
+MMAP_THRESHOLD = 8 * 1024 * 1024
+MMAP_SLICE = 16 * 1024 * 1024
 
 def calculate_file_md5(file_path: str | Path) -> str:
     """
     Calculate MD5 hash of a file and return it base64 encoded.
     This is specifically for the DTech API recording upload requirements.
-    
+
     Args:
         file_path: Path to the file
-        
+
     Returns:
         str: Base64 encoded MD5 hash of the file
     """
     file_path = Path(file_path)
     md5_hash = hashlib.md5()
-    
+
     with open(file_path, 'rb') as f:
-        # Read the file in chunks to handle large files
-        for chunk in iter(lambda: f.read(4096), b''):
-            md5_hash.update(chunk)
-            
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for offset in range(0, size, MMAP_SLICE):
+                        md5_hash.update(view[offset:offset + MMAP_SLICE])
+                finally:
+                    view.release()
+        else:
+            # Read the file in chunks to handle large files
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                md5_hash.update(chunk)
+
     # Get the binary hash and encode it to base64
+    return encode_md5(md5_hash)
+
+def encode_md5(md5_hash) -> str:
+    """Base64 encode an MD5 digest the way DTech expects in Content-MD5"""
     return base64.b64encode(md5_hash.digest()).decode('utf-8')
+
+async def aiter_file_chunks(
+    file_path: str | Path,
+    md5_hash: Optional["hashlib._Hash"] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Yield a file in chunks without blocking the event loop.
+
+    Disk reads run in a worker thread and only one chunk is held at a time,
+    so memory stays flat regardless of file size. If ``md5_hash`` is given
+    it is updated with every chunk, hashing the file in the same pass.
+    """
+    f = await asyncio.to_thread(open, file_path, 'rb')
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            if md5_hash is not None:
+                md5_hash.update(chunk)
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.utils.file_utils import calculate_file_md5
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FileSignature = Tuple[str, int, int, int]
+
+
+def file_signature(path: str | Path) -> FileSignature:
+    """(real path, size, mtime_ns, inode) - changes whenever the file does"""
+    real_path = os.path.realpath(path)
+    st = os.stat(real_path)
+    return real_path, st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class HashCache:
+    """Persistent recording hash cache keyed by file signature.
+
+    Backed by SQLite so it survives between batch runs and can be shared by
+    several processes on one host.
+    """
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recording_hashes ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, md5 TEXT)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, signature: FileSignature) -> Optional[str]:
+        path, size, mtime_ns, inode = signature
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT md5 FROM recording_hashes WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (path, size, mtime_ns, inode),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, signature: FileSignature, md5: str) -> None:
+        self.put_many({signature: md5})
+
+    def put_many(self, entries: Dict[FileSignature, str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO recording_hashes (path, size, mtime_ns, inode, md5) VALUES (?, ?, ?, ?, ?)",
+                [(*signature, md5) for signature, md5 in entries.items()],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class HashService:
+    """Recording MD5s with caching, thread offload and process-pool batches.
+
+    ``hash_files`` starts a process pool per call unless given a long-lived
+    ``executor``; batch jobs that call it repeatedly should pass one.
+    """
+
+    def __init__(
+        self, cache: Optional[HashCache] = None, workers: Optional[int] = None, executor: Optional[Executor] = None
+    ):
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+
+    def hash_file(self, path: str | Path) -> str:
+        """Base64 MD5 of one file, served from the cache when unchanged"""
+        signature = file_signature(path)
+        if self.cache is not None:
+            cached = self.cache.get(signature)
+            if cached is not None:
+                return cached
+        md5 = calculate_file_md5(signature[0])
+        if self.cache is not None:
+            self.cache.put(signature, md5)
+        return md5
+
+    async def hash_file_async(self, path: str | Path) -> str:
+        """hash_file on a worker thread so async handlers never block on disk"""
+        return await asyncio.to_thread(self.hash_file, path)
+
+    def hash_files(self, paths: Iterable[str | Path]) -> Dict[str, str]:
+        """Hash many files, spreading cache misses over a process pool.
+
+        Returns a mapping of each given path (as str) to its base64 MD5.
+        """
+        results: Dict[str, str] = {}
+        pending: Dict[str, FileSignature] = {}
+        for path in paths:
+            signature = file_signature(path)
+            cached = self.cache.get(signature) if self.cache is not None else None
+            if cached is not None:
+                results[str(path)] = cached
+            else:
+                pending[str(path)] = signature
+
+        if pending:
+            real_paths = [signature[0] for signature in pending.values()]
+            if len(pending) == 1 or self.workers == 1:
+                digests = [calculate_file_md5(p) for p in real_paths]
+            elif self.executor is not None:
+                digests = list(self.executor.map(calculate_file_md5, real_paths, chunksize=4))
+            else:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+                    digests = list(executor.map(calculate_file_md5, real_paths, chunksize=4))
+            for path, md5 in zip(pending, digests):
+                results[path] = md5
+            if self.cache is not None:
+                self.cache.put_many(dict(zip(pending.values(), digests)))
+        return results
+
+
+_hash_service: Optional[HashService] = None
+
+
+def get_hash_service() -> HashService:
+    """Shared HashService using the configured persistent cache"""
+    global _hash_service
+    if _hash_service is None:
+        cache = HashCache(settings.HASH_CACHE_PATH) if settings.HASH_CACHE_PATH else None
+        _hash_service = HashService(cache=cache, workers=settings.HASH_WORKERS or None)
+    return _hash_service
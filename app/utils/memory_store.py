@@ -0,0 +1,139 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    """In-process key/value store with TTLs and LRU eviction.
+
+    Used when Redis is unavailable. Each entry is a ``(expires_at, value)``
+    tuple holding the already-serialized string, so the store never aliases
+    caller objects and its byte footprint is just the sum of value lengths.
+    Expired entries are dropped on access and by a background sweeper that
+    pops a min-heap of expiry times, so a sweep only touches what expired.
+    Overwrites leave stale heap items behind; ``set`` compacts the heap once
+    they outnumber the live entries, so stores without a sweeper stay bounded.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        sweep_interval: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        expires_at = self._clock() + ttl
+        if key in self._entries:
+            self._remove(key)
+        if len(value) > self.max_bytes:
+            # Would evict everything else and still not fit
+            self.evictions += 1
+            return
+        self._entries[key] = (expires_at, value)
+        self._bytes += len(value)
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        self._evict()
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+    def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, (_, value) = self._entries.popitem(last=False)
+            self._bytes -= len(value)
+            self.evictions += 1
+
+    def sweep(self) -> int:
+        """Drop every expired entry; returns how many were removed"""
+        now = self._clock()
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # Heap items go stale when a key is overwritten or evicted
+            if entry is not None and entry[0] == expires_at:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        return removed
+
+    def _compact(self) -> None:
+        """Rebuild the heap from the live entries, dropping stale items"""
+        self._expiry_heap = [(expires_at, key) for key, (expires_at, _) in self._entries.items()]
+        heapq.heapify(self._expiry_heap)
+
+    async def _run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logger.debug("Memory store sweep removed %d expired entries", removed)
+
+    def start_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._run_sweeper())
+
+    async def stop_sweeper(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,34 +1,87 @@
-import redis
+import redis.asyncio as redis
+from redis.exceptions import RedisError
 from datetime import timedelta
 from typing import Any, Optional
 import json
+import time
 from config.settings import settings
+from app.core.metrics import SESSION_STORE_DURATION, registry
+from app.utils.memory_store import MemoryStore
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Merge a JSON patch into an existing session and refresh its expiry in a
+# single round trip. Missing sessions are left alone, like update_session.
+MERGE_SESSION_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+local data = cjson.decode(current)
+for k, v in pairs(cjson.decode(ARGV[1])) do
+    data[k] = v
+end
+redis.call('SET', KEYS[1], cjson.encode(data), 'EX', ARGV[2])
+return 1
+"""
+
 class SessionManager:
     def __init__(self):
+        self.pool = redis.ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=True,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        self.redis: Optional[redis.Redis] = None
+        self._memory_store = MemoryStore(
+            max_entries=settings.SESSION_MEMORY_MAX_ENTRIES,
+            max_bytes=settings.SESSION_MEMORY_MAX_BYTES,
+            sweep_interval=settings.SESSION_MEMORY_SWEEP_INTERVAL,
+        )
+        self._merge_script = None
+        self.default_expiry = timedelta(hours=24)
+        self._latency = {
+            (operation, backend): SESSION_STORE_DURATION.labels(operation, backend)
+            for operation in ("set", "get", "delete", "update")
+            for backend in ("redis", "memory")
+        }
+
+    def _observe(self, operation: str, start: float) -> None:
+        backend = "redis" if self.redis else "memory"
+        self._latency[operation, backend].observe(time.perf_counter() - start)
+
+    async def connect(self) -> None:
+        """Connect to Redis, falling back to in-memory storage if unreachable"""
+        client = redis.Redis(connection_pool=self.pool)
         try:
-            self.redis = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True,
-                socket_connect_timeout=1,
-            )
-            self.redis.ping()  # Test connection
-            logger.info(f"Connected to Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
-        except redis.ConnectionError:
+            await client.ping()  # Test connection
+        except (RedisError, OSError):
             logger.warning("Could not connect to Redis, falling back to in-memory storage")
+            await client.aclose()
             self.redis = None
-            self._memory_store = {}
-            
-        self.default_expiry = timedelta(hours=24)
+            self._memory_store.start_sweeper()
+            return
+        self.redis = client
+        logger.info("Connected to Redis at %s:%s", settings.REDIS_HOST, settings.REDIS_PORT)
+
+    async def close(self) -> None:
+        """Release pooled Redis connections"""
+        await self._memory_store.stop_sweeper()
+        if self.redis:
+            await self.redis.aclose()
+            self.redis = None
+            self._merge_script = None
+        await self.pool.disconnect()
 
     async def set_session(self, session_id: str, data: dict, expiry: Optional[timedelta] = None) -> None:
         """Store session data in Redis or memory"""
         expiry = expiry or self.default_expiry
+        start = time.perf_counter()
         if self.redis:
             await self.redis.setex(
                 f"session:{session_id}",
@@ -36,33 +89,69 @@ class SessionManager:
                 json.dumps(data)
             )
         else:
-            self._memory_store[f"session:{session_id}"] = {
-                'data': data,
-                'expiry': expiry
-            }
+            self._memory_store.set(
+                f"session:{session_id}",
+                json.dumps(data),
+                expiry.total_seconds()
+            )
+        self._observe("set", start)
 
     async def get_session(self, session_id: str) -> Optional[dict]:
         """Retrieve session data from Redis or memory"""
+        start = time.perf_counter()
         if self.redis:
             data = await self.redis.get(f"session:{session_id}")
-            return json.loads(data) if data else None
         else:
-            session = self._memory_store.get(f"session:{session_id}")
-            return session['data'] if session else None
+            data = self._memory_store.get(f"session:{session_id}")
+        self._observe("get", start)
+        return json.loads(data) if data else None
 
     async def delete_session(self, session_id: str) -> None:
         """Delete session data from Redis or memory"""
+        start = time.perf_counter()
         if self.redis:
             await self.redis.delete(f"session:{session_id}")
         else:
-            self._memory_store.pop(f"session:{session_id}", None)
+            self._memory_store.delete(f"session:{session_id}")
+        self._observe("delete", start)
 
     async def update_session(self, session_id: str, data: dict) -> None:
         """Update existing session data"""
-        existing = await self.get_session(session_id)
-        if existing:
-            existing.update(data)
-            await self.set_session(session_id, existing)
+        start = time.perf_counter()
+        if self.redis:
+            if self._merge_script is None:
+                self._merge_script = self.redis.register_script(MERGE_SESSION_SCRIPT)
+            await self._merge_script(
+                keys=[f"session:{session_id}"],
+                args=[json.dumps(data), int(self.default_expiry.total_seconds())]
+            )
+        else:
+            existing = await self.get_session(session_id)
+            if existing:
+                existing.update(data)
+                await self.set_session(session_id, existing)
+        self._observe("update", start)
+
+    def memory_stats(self) -> dict:
+        """Hit, miss and eviction counters for the in-memory fallback store"""
+        return self._memory_store.stats()
 
 # Global session manager instance
-session_manager = SessionManager()
\ No newline at end of file
+session_manager = SessionManager()
+
+registry.callback(
+    "session_memory_entries", "Sessions held by the in-memory fallback store",
+    lambda: session_manager.memory_stats()["entries"],
+)
+registry.callback(
+    "session_memory_bytes", "Bytes held by the in-memory fallback store",
+    lambda: session_manager.memory_stats()["bytes"],
+)
+registry.callback(
+    "session_memory_events", "In-memory fallback store lookups and removals",
+    lambda: {
+        (event,): session_manager.memory_stats()[event]
+        for event in ("hits", "misses", "evictions", "expirations")
+    },
+    ("event",), type_name="counter",
+)
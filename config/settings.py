@@ -18,6 +18,11 @@ class Settings(BaseSettings):
     APPWRITE_DATABASE_ID: str = os.getenv('APPWRITE_DATABASE_ID', "")
     APPWRITE_SALES_COLLECTION_ID: str = os.getenv('APPWRITE_SALES_COLLECTION_ID', "")
     APPWRITE_RECORDINGS_COLLECTION_ID: str = os.getenv('APPWRITE_RECORDINGS_COLLECTION_ID', "")
+    APPWRITE_HEALTH_INTERVAL: float = float(os.getenv('APPWRITE_HEALTH_INTERVAL', 30.0))
+    APPWRITE_POOL_SIZE: int = int(os.getenv('APPWRITE_POOL_SIZE', 20))
+    APPWRITE_MAX_WORKERS: int = int(os.getenv('APPWRITE_MAX_WORKERS', 16))
+    APPWRITE_MAX_CONCURRENCY: int = int(os.getenv('APPWRITE_MAX_CONCURRENCY', 64))
+    APPWRITE_TIMEOUT: float = float(os.getenv('APPWRITE_TIMEOUT', 10.0))
     
     # DTech API Settings
     DIFFERENT_API_TEST: str = os.getenv('DIFFERENT_API_TEST', "")
@@ -28,15 +33,123 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = os.getenv('AWS_SECRET_ACCESS_KEY', "")
     AWS_REGION: str = os.getenv('AWS_REGION', "")
     AWS_SERVICE: str = os.getenv('AWS_SERVICE', "")
+
+    # DTech HTTP Client Settings (Optional with defaults)
+    DTECH_MAX_CONNECTIONS: int = int(os.getenv('DTECH_MAX_CONNECTIONS', 100))
+    DTECH_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv('DTECH_MAX_KEEPALIVE_CONNECTIONS', 20))
+    DTECH_KEEPALIVE_EXPIRY: float = float(os.getenv('DTECH_KEEPALIVE_EXPIRY', 30.0))
+    DTECH_HTTP2: bool = os.getenv('DTECH_HTTP2', "false").lower() in ("1", "true", "yes")
+    DTECH_TIMEOUT: float = float(os.getenv('DTECH_TIMEOUT', 15.0))
+    DTECH_CONNECT_TIMEOUT: float = float(os.getenv('DTECH_CONNECT_TIMEOUT', 5.0))
+    DTECH_POOL_TIMEOUT: float = float(os.getenv('DTECH_POOL_TIMEOUT', 5.0))
+    DTECH_STATUS_TIMEOUT: float = float(os.getenv('DTECH_STATUS_TIMEOUT', 5.0))
+    DTECH_UPLOAD_TIMEOUT: float = float(os.getenv('DTECH_UPLOAD_TIMEOUT', 300.0))
+    DTECH_RETRY_ATTEMPTS: int = int(os.getenv('DTECH_RETRY_ATTEMPTS', 3))
+    DTECH_RETRY_BASE_DELAY: float = float(os.getenv('DTECH_RETRY_BASE_DELAY', 0.2))
+    DTECH_RETRY_MAX_DELAY: float = float(os.getenv('DTECH_RETRY_MAX_DELAY', 5.0))
+    DTECH_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv('DTECH_BREAKER_FAILURE_THRESHOLD', 5))
+    DTECH_BREAKER_RESET_TIMEOUT: float = float(os.getenv('DTECH_BREAKER_RESET_TIMEOUT', 30.0))
+    DTECH_DRAIN_TIMEOUT: float = float(os.getenv('DTECH_DRAIN_TIMEOUT', 20.0))
+    # Outbound rate limits (requests/second, 0 disables), shared via Redis when connected.
+    # DTECH_RATE_LIMITS overrides per operation, e.g. "get_status=100:200,create_process=10:20"
+    DTECH_RATE_LIMIT: float = float(os.getenv('DTECH_RATE_LIMIT', 100.0))
+    DTECH_RATE_BURST: int = int(os.getenv('DTECH_RATE_BURST', 200))
+    DTECH_RATE_LIMITS: str = os.getenv('DTECH_RATE_LIMITS', "")
+    # Off by default: /start and /continue all run under DIFFERENT_ACCOUNT_ID,
+    # so a per-account limit is one limit shared by every agent
+    DTECH_ACCOUNT_RATE_LIMIT: float = float(os.getenv('DTECH_ACCOUNT_RATE_LIMIT', 0.0))
+    DTECH_ACCOUNT_RATE_BURST: int = int(os.getenv('DTECH_ACCOUNT_RATE_BURST', 100))
+    DTECH_RATE_MAX_WAIT: float = float(os.getenv('DTECH_RATE_MAX_WAIT', 10.0))
+
+    # DTech status cache (TTL of 0 disables caching but keeps coalescing)
+    STATUS_CACHE_TTL: float = float(os.getenv('STATUS_CACHE_TTL', 3.0))
+    STATUS_CACHE_STALE_TTL: float = float(os.getenv('STATUS_CACHE_STALE_TTL', 10.0))
+    STATUS_CACHE_BACKEND: str = os.getenv('STATUS_CACHE_BACKEND', "memory")  # memory | redis
+    STATUS_CACHE_MAX_ENTRIES: int = int(os.getenv('STATUS_CACHE_MAX_ENTRIES', 10000))
+
+    # Batch status endpoint
+    STATUS_BATCH_MAX_ITEMS: int = int(os.getenv('STATUS_BATCH_MAX_ITEMS', 500))
+    STATUS_BATCH_CONCURRENCY: int = int(os.getenv('STATUS_BATCH_CONCURRENCY', 20))
+    STATUS_BATCH_ITEM_TIMEOUT: float = float(os.getenv('STATUS_BATCH_ITEM_TIMEOUT', 10.0))
+
+    # Local read model of started sales processes behind GET /processes
+    PROCESS_INDEX_RETENTION: float = float(os.getenv('PROCESS_INDEX_RETENTION', 30 * 86400.0))
+    PROCESS_INDEX_MAX_ENTRIES: int = int(os.getenv('PROCESS_INDEX_MAX_ENTRIES', 10000))
+    PROCESS_LIST_MAX_LIMIT: int = int(os.getenv('PROCESS_LIST_MAX_LIMIT', 200))
+    PROCESS_LIST_MAX_SCAN: int = int(os.getenv('PROCESS_LIST_MAX_SCAN', 2000))
+
+    # Bulk NDJSON /start ingestion
+    BULK_START_CONCURRENCY: int = int(os.getenv('BULK_START_CONCURRENCY', 20))
+    BULK_START_MAX_LINE_BYTES: int = int(os.getenv('BULK_START_MAX_LINE_BYTES', 64 * 1024))
+
+    # /start idempotency (Idempotency-Key header, else a lead content hash)
+    IDEMPOTENCY_KEY_TTL: float = float(os.getenv('IDEMPOTENCY_KEY_TTL', 86400.0))
+    IDEMPOTENCY_DEDUPE_TTL: float = float(os.getenv('IDEMPOTENCY_DEDUPE_TTL', 300.0))
+    # Renewed while the create runs; it only bounds how long a crashed worker's claim blocks retries
+    IDEMPOTENCY_LOCK_TTL: float = float(os.getenv('IDEMPOTENCY_LOCK_TTL', 60.0))
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 30.0))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 10000))
+
+    # Recording upload progress (Redis hash per upload, pushed over SSE)
+    UPLOAD_STATUS_TTL: float = float(os.getenv('UPLOAD_STATUS_TTL', 3600.0))
+    UPLOAD_EVENTS_KEEPALIVE: float = float(os.getenv('UPLOAD_EVENTS_KEEPALIVE', 15.0))
+    UPLOAD_STATUS_MAX_ENTRIES: int = int(os.getenv('UPLOAD_STATUS_MAX_ENTRIES', 10000))
+
+    # Notification digests
+    SMTP_HOST: str = os.getenv('SMTP_HOST', "localhost")
+    SMTP_PORT: int = int(os.getenv('SMTP_PORT', 25))
+    NOTIFY_FROM: str = os.getenv('NOTIFY_FROM', "noreply@dtech.com")
+    NOTIFY_TO: str = os.getenv('NOTIFY_TO', "admin@dtech.com")
+    NOTIFY_QUEUE_SIZE: int = int(os.getenv('NOTIFY_QUEUE_SIZE', 10000))
+    NOTIFY_OVERFLOW_POLICY: str = os.getenv('NOTIFY_OVERFLOW_POLICY', "drop_oldest")  # drop_newest | drop_oldest | block
+    NOTIFY_BATCH_INTERVAL: float = float(os.getenv('NOTIFY_BATCH_INTERVAL', 60.0))
+    NOTIFY_MAX_BATCH: int = int(os.getenv('NOTIFY_MAX_BATCH', 500))
+
+    # Recording hash cache (empty path disables persistence)
+    HASH_CACHE_PATH: str = os.getenv('HASH_CACHE_PATH', str(Path.home() / ".cache" / "miway" / "recording_hashes.sqlite3"))
+    HASH_WORKERS: int = int(os.getenv('HASH_WORKERS', 0))
+
+    # Write-behind persistence of sales processes and recordings to Appwrite
+    # (empty journal path discards records Appwrite could not take)
+    PERSIST_QUEUE_SIZE: int = int(os.getenv('PERSIST_QUEUE_SIZE', 10000))
+    PERSIST_BATCH_SIZE: int = int(os.getenv('PERSIST_BATCH_SIZE', 100))
+    PERSIST_FLUSH_INTERVAL: float = float(os.getenv('PERSIST_FLUSH_INTERVAL', 1.0))
+    PERSIST_CONCURRENCY: int = int(os.getenv('PERSIST_CONCURRENCY', 4))
+    PERSIST_RETRY_ATTEMPTS: int = int(os.getenv('PERSIST_RETRY_ATTEMPTS', 3))
+    PERSIST_RETRY_BASE_DELAY: float = float(os.getenv('PERSIST_RETRY_BASE_DELAY', 0.5))
+    PERSIST_RETRY_MAX_DELAY: float = float(os.getenv('PERSIST_RETRY_MAX_DELAY', 5.0))
+    PERSIST_JOURNAL_PATH: str = os.getenv('PERSIST_JOURNAL_PATH', str(Path.home() / ".cache" / "miway" / "persistence_journal.sqlite3"))
+    PERSIST_REPLAY_INTERVAL: float = float(os.getenv('PERSIST_REPLAY_INTERVAL', 30.0))
+    PERSIST_MAX_REPLAYS: int = int(os.getenv('PERSIST_MAX_REPLAYS', 10))
+    PERSIST_DRAIN_TIMEOUT: float = float(os.getenv('PERSIST_DRAIN_TIMEOUT', 5.0))
+
+    # Production server (run.py --prod); 0 workers means one per available CPU
+    WEB_CONCURRENCY: int = int(os.getenv('WEB_CONCURRENCY', 0))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))
+
+    # Logging: records are queued and written as JSON lines by a background thread.
+    # LOG_SAMPLING keeps a fraction of DEBUG records per logger, e.g. "app.utils.session=0.01"
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', "INFO")
+    LOG_FORMAT: str = os.getenv('LOG_FORMAT', "json")  # json | text
+    LOG_SAMPLING: str = os.getenv('LOG_SAMPLING', "")
+    LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
     # Redis Settings (Optional with defaults)
     REDIS_HOST: str = os.getenv('REDIS_HOST', "localhost")
     REDIS_PORT: int = int(os.getenv('REDIS_PORT', 6379))
     REDIS_DB: int = int(os.getenv('REDIS_DB', 0))
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2.0))
+    REDIS_CONNECT_TIMEOUT: float = float(os.getenv('REDIS_CONNECT_TIMEOUT', 1.0))
 
     # Security Settings (Optional with defaults)
     SECRET_KEY: str = os.getenv('SECRET_KEY', "dev-secret-key-123456789")
     SESSION_COOKIE_NAME: str = os.getenv('SESSION_COOKIE_NAME', "")
     SESSION_EXPIRE_MINUTES: int = int(os.getenv('SESSION_EXPIRE_MINUTES', 1440))
+    # In-memory session store used when Redis is unreachable
+    SESSION_MEMORY_MAX_ENTRIES: int = int(os.getenv('SESSION_MEMORY_MAX_ENTRIES', 10000))
+    SESSION_MEMORY_MAX_BYTES: int = int(os.getenv('SESSION_MEMORY_MAX_BYTES', 64 * 1024 * 1024))
+    SESSION_MEMORY_SWEEP_INTERVAL: float = float(os.getenv('SESSION_MEMORY_SWEEP_INTERVAL', 30.0))
 
     # Test User Configuration (Optional with defaults)
     TEST_USER_EXTERNAL_ID: Optional[str] = os.getenv('TEST_USER_EXTERNAL_ID', None)
@@ -1,13 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from app.api.v1 import sales
+from app.api.v1 import sales, metrics
+from app.core.dtech_client import init_dtech_client, close_dtech_client
+from app.utils.session import session_manager
+from app.utils.background import notifier
+from app.services.upload_progress import upload_tracker
+from app.services.persistence import persistence
+from app.core.appwrite_async import appwrite
+from app.core.logs import RequestIdMiddleware, configure_logging
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry
+from app.core.responses import ORJSONResponse
+from app.core.templates import templates
+
+# No-op when run.py already configured it; covers workers that import the app directly
+configure_logging()
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Independent of each other, so a slow Redis connect overlaps with
+    # building the DTech client instead of adding to it
+    await asyncio.gather(
+        session_manager.connect(),
+        init_dtech_client(),
+        notifier.start(),
+        persistence.start(),
+    )
+    # Needs to know whether Redis came up
+    await upload_tracker.start()
+    try:
+        yield
+    finally:
+        # Drain DTech calls first: their results may still be written to
+        # Redis or queued as notifications and Appwrite writes
+        await close_dtech_client()
+        # Before the Appwrite thread pool goes away
+        await persistence.stop()
+        await upload_tracker.stop()
+        await notifier.stop()
+        await session_manager.close()
+        appwrite.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(MetricsMiddleware)
+# Added last so it wraps everything, including the metrics middleware
+app.add_middleware(RequestIdMiddleware)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
 app.include_router(sales.router, prefix="/api/v1/sales", tags=["Sales"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["Metrics"])
 
 @app.get("/")
 def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)"""
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
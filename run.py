@@ -1,3 +1,21 @@
+"""
+Start the API server.
+
+    python run.py           # development: one process, auto-reload, debug logging
+    python run.py --prod    # production: one worker per CPU, preloaded under gunicorn
+
+In production the worker count comes from --workers, else WEB_CONCURRENCY,
+else the CPUs this process may run on. uvloop and httptools are used when
+installed. With gunicorn available the app is imported once in the master
+and forked into the workers; otherwise uvicorn's own process manager runs
+the workers. On SIGTERM workers stop accepting connections, finish
+in-flight requests and drain DTech calls before exiting.
+"""
+import argparse
+import gc
+import importlib.util
+import math
+import os
 import sys
 import uvicorn
 import logging
@@ -7,22 +25,121 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+from config.settings import settings  # noqa: E402
+from app.core.logs import configure_logging  # noqa: E402
+
+logger = logging.getLogger("Miway")
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def shutdown_budget() -> int:
+    """Seconds a worker may take to stop: in-flight requests, then the lifespan drains"""
+    drains = settings.DTECH_DRAIN_TIMEOUT + settings.PERSIST_DRAIN_TIMEOUT
+    # Plus a little for closing Redis, Appwrite and the log writer
+    return math.ceil(settings.SERVER_GRACEFUL_TIMEOUT + drains) + 5
+
+
+def run_dev(args) -> None:
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        reload=True,
+        log_level="debug",
+        log_config=None,
+    )
+
+
+def run_gunicorn(args, workers: int) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    # uvicorn's bundled worker moved to the uvicorn-worker package
+    if installed("uvicorn_worker"):
+        from uvicorn_worker import UvicornWorker
+    else:
+        from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        # The stock worker leaves in-flight requests unbounded and relies on
+        # gunicorn's kill; bound them so the drains still fit in the budget
+        CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT}
+
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": workers,
+        "worker_class": Worker,
+        "preload_app": True,
+        # gunicorn SIGKILLs a worker still running after this, so it has to
+        # cover the request grace period and the DTech and persistence drains
+        "graceful_timeout": shutdown_budget(),
+        "loglevel": "info",
+    }
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            # Keep the preloaded heap out of the collector so forked
+            # workers don't touch (and copy) its pages
+            gc.freeze()
+            return app
+
+    Application().run()
+
+
+def run_prod(args) -> None:
+    workers = args.workers or settings.WEB_CONCURRENCY or available_cpus()
+    loop = "uvloop" if installed("uvloop") else "asyncio"
+    http = "httptools" if installed("httptools") else "h11"
+    if installed("gunicorn"):
+        logger.info("Starting %d gunicorn workers (loop=%s, http=%s, preloaded)", workers, loop, http)
+        run_gunicorn(args, workers)
+        return
+    logger.info("Starting %d uvicorn workers (loop=%s, http=%s); install gunicorn to preload the app", workers, loop, http)
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        log_level="info",
+        log_config=None,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+    )
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prod", action="store_true", help="Production mode")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=4005)
+    parser.add_argument("--workers", type=int, help="Worker processes in production mode")
+    args = parser.parse_args()
     try:
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        logger = logging.getLogger("Miway")
+        if not args.prod:
+            # The reloader serves from a fresh interpreter that configures
+            # logging from the environment when it imports the app
+            os.environ.setdefault("LOG_LEVEL", "DEBUG")
+        configure_logging(level=os.environ.get("LOG_LEVEL", "INFO" if args.prod else "DEBUG"))
         logger.info("Starting surestrat api")
-        uvicorn.run(
-            "main:app",
-            host="0.0.0.0",
-            port=4005,
-            reload=True,
-            log_level="debug",
-            log_config=None,
-        )
+        if args.prod:
+            run_prod(args)
+        else:
+            run_dev(args)
     except Exception as e:
         print(f"An error occurred while starting the server: {e}")
         traceback.print_exc()
@@ -0,0 +1,111 @@
+"""
+Benchmark per-call httpx clients against the shared pooled DTech client.
+
+Starts a tiny local HTTP/1.1 keep-alive server that counts accepted
+connections, then issues the same number of requests through both paths
+and reports latency percentiles and connections (handshakes) per request.
+
+    python scripts/bench_dtech_client.py --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx  # noqa: E402
+
+from app.core.dtech_client import DTechClient  # noqa: E402
+from app.core.rate_limit import OutboundLimiter  # noqa: E402
+
+BODY = b'{"status": "in_progress"}'
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n"
+    b"Connection: keep-alive\r\n\r\n" + BODY
+)
+
+
+class CountingServer:
+    def __init__(self):
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readuntil(b"\r\n\r\n")
+                if not header:
+                    break
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run(label, send, total, concurrency, server):
+    server.connections = 0
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await send()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000  # noqa: E731
+    print(
+        f"{label:<18} rps={total / elapsed:8.0f}  p50={p(0.50):6.2f}ms  p95={p(0.95):6.2f}ms  "
+        f"p99={p(0.99):6.2f}ms  mean={statistics.mean(latencies) * 1000:6.2f}ms  "
+        f"handshakes/req={server.connections / total:.3f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    server = CountingServer()
+    tcp = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = tcp.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/ext/status/spid/account"
+
+    async def per_call_client():
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url)
+            response.raise_for_status()
+
+    pooled = DTechClient(
+        limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+        rate_limiter=OutboundLimiter({}),
+    )
+    await pooled.start()
+
+    async def shared_client():
+        response = await pooled.request("get_status", "GET", url)
+        response.raise_for_status()
+
+    async with tcp:
+        await run("per-call client", per_call_client, args.requests, args.concurrency, server)
+        await run("shared client", shared_client, args.requests, args.concurrency, server)
+    await pooled.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Benchmark per-request JSON CPU cost on the DTech proxy endpoints.
+
+For each upstream call, compares the original pipeline (response.json(),
+dict/model round trip, stdlib JSONResponse) against the current one
+(model_validate_json on the raw bytes, orjson rendering), plus request
+body encoding for signing. Times are CPU microseconds per request.
+
+    python scripts/bench_json.py --iterations 20000
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core.responses import ORJSONResponse, dumps  # noqa: E402
+from app.schemas.sales import (  # noqa: E402
+    ContinueProcessResponse, ProcessStatusResponse, SalesProcessResponse, StopProcessResponse
+)
+
+SPID = str(uuid.uuid4())
+ACCOUNT_ID = "00000000-0000-4000-8000-000000000001"
+URL = f"https://dtech.example.com/dl/ext/start/{SPID}/{uuid.uuid4()}"
+
+UPSTREAM = {
+    "start": (SalesProcessResponse, {"sales_process_id": SPID, "url": URL, "url_expiry": "2024-01-01T10:15:00.123456"}),
+    "continue": (ContinueProcessResponse, {"url": URL, "url_expiry": "2024-01-01T10:15:00.123456"}),
+    "status": (ProcessStatusResponse, {"status": "in_progress", "sales_process_id": SPID, "account_id": ACCOUNT_ID}),
+    "stop": (StopProcessResponse, {"sales_process_id": SPID, "status": "stopped", "reason": "customer request"}),
+}
+
+REQUEST_BODY = {
+    "account_id": ACCOUNT_ID,
+    "user": {
+        "external_id": "AgentSystemID1",
+        "first_name": "AgentName1",
+        "last_name": "AgentSurname1",
+        "provider_id": "c69f2d28-906a-3468-013b-6396e468a103",
+    },
+    "lead": {
+        "first_name": "John99",
+        "last_name": "Doe99",
+        "phone_mobile": "(083) 555-5599",
+        "campaign_code": "MWLItalkTestDefault",
+        "lead_origin": "Our test website",
+    },
+}
+
+
+def legacy(model, body: bytes) -> bytes:
+    data = json.loads(body)
+    if model is SalesProcessResponse:
+        # /start validated into the model and dumped back to a dict
+        data = model(**data).model_dump(mode="json")
+    return JSONResponse(data).body
+
+
+def current(model, body: bytes) -> bytes:
+    return ORJSONResponse(model.model_validate_json(body).model_dump(mode="json")).body
+
+
+def cpu_us(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def report(label, before, after):
+    print(f"{label:<16} {before:8.2f}us -> {after:8.2f}us  ({after / before - 1:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, (model, payload) in UPSTREAM.items():
+        body = json.dumps(payload).encode("utf-8")
+        assert json.loads(legacy(model, body)) == json.loads(current(model, body))
+        report(
+            name,
+            cpu_us(lambda: legacy(model, body), args.iterations),
+            cpu_us(lambda: current(model, body), args.iterations),
+        )
+
+    report(
+        "encode_payload",
+        cpu_us(lambda: json.dumps(REQUEST_BODY, separators=(",", ":")).encode("utf-8"), args.iterations),
+        cpu_us(lambda: dumps(REQUEST_BODY), args.iterations),
+    )
+
+
+if __name__ == "__main__":
+    main()
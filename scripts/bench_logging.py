@@ -0,0 +1,131 @@
+"""
+Requests per second with logging off, written synchronously, and queued.
+
+Runs the app in-process against the DTech simulator (see
+scripts/bench_sales_api.py) with an access-log line per request, as
+uvicorn would write in production, and DEBUG enabled so the DTech client's
+per-attempt debug lines are emitted too. Each mode runs the same request
+mix:
+
+- off:     logging disabled
+- sync:    the old setup, a StreamHandler on the root logger writing from
+           the event loop
+- queued:  the JSON pipeline from app.core.logs
+- sampled: the JSON pipeline keeping 1% of app.core.dtech_client DEBUG lines
+
+Log output goes to --log-file (default: the null device).
+
+    python scripts/bench_logging.py --requests 3000 --concurrency 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.bench_sales_api import ACCOUNT_ID, LEAD, USER, in_process_app, run  # noqa: E402
+
+MODES = ("off", "sync", "queued", "sampled")
+
+access_logger = logging.getLogger("uvicorn.access")
+
+
+class AccessLogMiddleware:
+    """Stand-in for uvicorn's access log, which ASGITransport skips"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        access_logger.info('%s - "%s %s HTTP/1.1" %d', "127.0.0.1:0", scope["method"], scope["path"], status_code)
+
+
+def use_mode(mode: str, log_file) -> None:
+    from app.core.logs import pipeline
+
+    logging.disable(logging.NOTSET)
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elif mode == "sync":
+        pipeline.stop()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(log_file)
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+    else:
+        sampling = "app.core.dtech_client=0.01" if mode == "sampled" else ""
+        pipeline.configure(level="DEBUG", fmt="json", sampling=sampling, stream=log_file)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of modes")
+    parser.add_argument("--log-file", default=os.devnull)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated DTech latency in seconds")
+    args = parser.parse_args()
+    # in_process_app reads these from its own CLI namespace
+    args.jitter, args.error_rate, args.seed, args.no_verify = 0.0, 0.0, 1, True
+    args.status_cache_ttl, args.rate_limit = 0.0, False
+
+    import main as service
+    service.app.add_middleware(AccessLogMiddleware)
+
+    modes = [mode for mode in args.modes.split(",") if mode in MODES]
+    results = {}
+    with open(args.log_file, "w") as log_file:
+        async with in_process_app(args) as client:
+            response = await client.post(
+                "/api/v1/sales/start", json={"account_id": ACCOUNT_ID, "user": USER, "lead": LEAD}
+            )
+            response.raise_for_status()
+            spid = response.json()["sales_process_id"]
+            status = f"/api/v1/sales/status/{spid}/{ACCOUNT_ID}"
+            # Warm up so the first mode doesn't pay for lazy initialization
+            use_mode("off", log_file)
+            await run(client, "warmup", "GET", status, {}, min(args.requests, 200), args.concurrency)
+            for mode in modes:
+                use_mode(mode, log_file)
+                row = await run(client, mode, "GET", status, {}, args.requests, args.concurrency)
+                results[mode] = row
+                print(
+                    f"{mode:<8} rps={row['rps']:8.0f}  p50={row['p50_ms']:7.2f}ms  "
+                    f"p95={row['p95_ms']:7.2f}ms  errors={row['errors']}"
+                )
+        # Flush before the log file closes and keep later records out of it
+        from app.core.logs import pipeline
+        pipeline.stop()
+        logging.disable(logging.CRITICAL)
+        stats = pipeline.stats()
+
+    if "off" in results:
+        baseline = results["off"]["rps"]
+        for mode, row in results.items():
+            if mode != "off":
+                print(f"{mode:<8} {row['rps'] / baseline - 1:+.1%} RPS vs logging off")
+    print(f"queued pipeline: dropped={stats['dropped']} sampled_out={stats['sampled_out']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+"""
+Benchmark the /api/v1/sales endpoints against the local DTech simulator.
+
+By default the service runs in-process with its DTech client wired to
+scripts/dtech_simulator.py (SigV4 verification on), so runs are
+repeatable and need no network. For each endpoint it reports requests per
+second, p50/p95/p99 latency and errors. Pass --url to benchmark a running
+server instead (start the simulator and set DIFFERENT_API_TEST first).
+
+Save a run with --output and compare later runs with --baseline; the
+script exits non-zero when any endpoint's p95 regresses by more than
+--tolerance.
+
+    python scripts/bench_sales_api.py --requests 2000 --concurrency 50 --latency 0.02 --output bench.json
+    python scripts/bench_sales_api.py --requests 2000 --concurrency 50 --latency 0.02 --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx  # noqa: E402
+
+ACCOUNT_ID = "00000000-0000-4000-8000-000000000001"
+USER = {
+    "external_id": "AgentSystemID1",
+    "first_name": "AgentName1",
+    "last_name": "AgentSurname1",
+    "provider_id": "c69f2d28-906a-3468-013b-6396e468a103",
+}
+LEAD = {
+    "first_name": "John99",
+    "last_name": "Doe99",
+    "phone_mobile": "(083) 555-5599",
+    "campaign_code": "MWLItalkTestDefault",
+    "lead_origin": "Benchmark",
+}
+
+
+def scenarios(spid: str):
+    """(name, method, path, request kwargs) for every benchmarked endpoint.
+
+    kwargs may be a callable returning fresh kwargs per request.
+    """
+    start_body = {"account_id": ACCOUNT_ID, "user": USER, "lead": LEAD}
+    return [
+        # A fresh Idempotency-Key per request so every call reaches DTech
+        ("start", "POST", "/api/v1/sales/start",
+         lambda: {"json": start_body, "headers": {"Idempotency-Key": str(uuid.uuid4())}}),
+        ("start_duplicate", "POST", "/api/v1/sales/start", {"json": start_body}),
+        ("continue", "POST", f"/api/v1/sales/continue/{spid}",
+         {"json": {"request": {"account_id": ACCOUNT_ID}, "user": USER}}),
+        ("status", "GET", f"/api/v1/sales/status/{spid}/{ACCOUNT_ID}", {}),
+        ("status_batch", "POST", "/api/v1/sales/status/batch",
+         {"json": {"items": [{"spid": f"{spid}-{i}", "account_id": ACCOUNT_ID} for i in range(10)]}}),
+        ("stop", "POST", f"/api/v1/sales/stop/{spid}",
+         {"json": {"account_id": ACCOUNT_ID}, "params": {"reason": "benchmark"}}),
+        ("recording_url", "POST", f"/api/v1/sales/recording-url/{spid}",
+         {"json": {
+             "account_id": ACCOUNT_ID,
+             "date_start": "2024-01-01T10:00:00",
+             "date_end": "2024-01-01T10:05:00",
+             "recording_hash": "1B2M2Y8AsgTpgAmY7PhCfg==",
+             "filename": "call.wav",
+             "content_type": "audio/wav",
+         }}),
+    ]
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+
+async def run(client, name, method, path, kwargs, total, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, path, **(kwargs() if callable(kwargs) else kwargs))
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": name,
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+@asynccontextmanager
+async def in_process_app(args):
+    import main
+    from app.core import dtech_client
+    from app.core.rate_limit import OutboundLimiter
+    from app.services.status_cache import status_cache
+    from app.utils.aws_auth import AWSRequestSigner
+    from app.utils.session import session_manager
+    from config.settings import settings
+    from scripts.dtech_simulator import Faults, create_app
+
+    signer = AWSRequestSigner(
+        access_key=settings.AWS_ACCESS_KEY_ID,
+        secret_key=settings.AWS_SECRET_ACCESS_KEY,
+        region=settings.AWS_REGION or "eu-west-1",
+        service=settings.AWS_SERVICE or "execute-api",
+    )
+    simulator = create_app(
+        Faults(args.latency, args.jitter, args.error_rate, seed=args.seed),
+        signer=None if args.no_verify else signer,
+    )
+    settings.DIFFERENT_API_TEST = "http://dtech-simulator"
+    # Every request uses the same account, so the client-side limits would
+    # cap the run; leave them off unless they are what's being measured
+    rate_limiter = dtech_client.build_rate_limiter() if args.rate_limit else OutboundLimiter({})
+    dtech_client._dtech_client = dtech_client.DTechClient(
+        transport=httpx.ASGITransport(app=simulator), rate_limiter=rate_limiter
+    )
+    if args.status_cache_ttl is not None:
+        status_cache.ttl = args.status_cache_ttl
+
+    async with main.lifespan(main.app):
+        session_id = str(uuid.uuid4())
+        await session_manager.set_session(session_id, {"user_id": "bench", "email": "bench@example.com"})
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test", cookies={"session_id": session_id}, timeout=60
+        ) as client:
+            yield client
+        counts = simulator.state.counts
+        print(
+            f"\nsimulator: {counts['requests']} requests, {counts['injected_errors']} injected errors, "
+            f"{counts['signature_failures']} signature failures"
+        )
+
+
+@asynccontextmanager
+async def live_app(args):
+    cookies = {"session_id": args.session_id} if args.session_id else None
+    async with httpx.AsyncClient(base_url=args.url, cookies=cookies, timeout=60) as client:
+        yield client
+
+
+def compare(results, baseline_path: Path, tolerance: float) -> bool:
+    baseline = {row["endpoint"]: row for row in json.loads(baseline_path.read_text())}
+    ok = True
+    for row in results:
+        before = baseline.get(row["endpoint"])
+        if before is None:
+            continue
+        change = row["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        flag = "REGRESSION" if change > tolerance else "ok"
+        ok = ok and flag == "ok"
+        print(f"{row['endpoint']:<16} p95 {before['p95_ms']:8.2f}ms -> {row['p95_ms']:8.2f}ms ({change:+.0%}) {flag}")
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Benchmark a running server instead of in-process")
+    parser.add_argument("--session-id", help="Session cookie for /recording-url when using --url")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--endpoints", help="Comma-separated subset of endpoints to run")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated DTech latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-verify", action="store_true", help="Skip SigV4 verification in the simulator")
+    parser.add_argument("--rate-limit", action="store_true", help="Apply the DTECH_RATE_* outbound limits")
+    parser.add_argument("--status-cache-ttl", type=float, help="Override STATUS_CACHE_TTL (0 disables caching)")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare p95 against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    wanted = set(args.endpoints.split(",")) if args.endpoints else None
+    app = live_app(args) if args.url else in_process_app(args)
+    results = []
+    async with app as client:
+        response = await client.post("/api/v1/sales/start", json={"account_id": ACCOUNT_ID, "user": USER, "lead": LEAD})
+        response.raise_for_status()
+        spid = response.json()["sales_process_id"]
+        for name, method, path, kwargs in scenarios(spid):
+            if wanted and name not in wanted:
+                continue
+            if name == "recording_url" and args.url and not args.session_id:
+                print("recording_url    skipped (needs --session-id with --url)")
+                continue
+            row = await run(client, name, method, path, kwargs, args.requests, args.concurrency)
+            results.append(row)
+            print(
+                f"{name:<16} rps={row['rps']:8.0f}  p50={row['p50_ms']:7.2f}ms  p95={row['p95_ms']:7.2f}ms  "
+                f"p99={row['p99_ms']:7.2f}ms  errors={row['errors']}"
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Throughput benchmark for SessionManager reads.
+
+Runs against a local Redis when one is reachable (or --redis-url is given),
+otherwise against fakeredis's asyncio client.
+
+    python scripts/bench_session.py --reads 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import redis.asyncio as redis  # noqa: E402
+
+from app.utils.session import SessionManager  # noqa: E402
+
+
+async def build_manager(redis_url):
+    manager = SessionManager()
+    if redis_url:
+        manager.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        await manager.redis.ping()
+        return manager, redis_url
+    await manager.connect()
+    if manager.redis:
+        return manager, "local redis"
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("No Redis reachable and fakeredis is not installed")
+    manager.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return manager, "fakeredis"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    manager, backend = await build_manager(args.redis_url)
+    session_ids = [f"bench-{i}" for i in range(100)]
+    for session_id in session_ids:
+        await manager.set_session(session_id, {"user_id": session_id, "email": f"{session_id}@example.com"})
+
+    start = time.perf_counter()
+    for i in range(args.reads):
+        await manager.get_session(session_ids[i % len(session_ids)])
+    sequential = args.reads / (time.perf_counter() - start)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def read(i):
+        async with semaphore:
+            await manager.get_session(session_ids[i % len(session_ids)])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(read(i) for i in range(args.reads)))
+    concurrent = args.reads / (time.perf_counter() - start)
+
+    print(f"backend: {backend}")
+    print(f"sequential reads: {sequential:10.0f} reads/s")
+    print(f"concurrent reads: {concurrent:10.0f} reads/s  (concurrency={args.concurrency})")
+
+    for session_id in session_ids:
+        await manager.delete_session(session_id)
+    await manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
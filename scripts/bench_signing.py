@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of AWS SigV4 signing throughput.
+
+Compares the original per-call signing (full four-step key derivation and
+URL parsing on every request) against AWSRequestSigner with its cached
+signing keys and precomputed canonical pieces.
+
+    python scripts/bench_signing.py --iterations 50000
+"""
+import argparse
+import datetime
+import hashlib
+import hmac
+import json
+import sys
+import time
+import urllib.parse
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.utils.aws_auth import AWSRequestSigner  # noqa: E402
+from app.services.dtech_service import encode_payload  # noqa: E402
+
+URL = "https://test-dsp.integrations.different.co.za/ext/start"
+PAYLOAD = {
+    "account_id": "00000000-0000-0000-0000-000000000000",
+    "user": {"external_id": "AgentSystemID1", "first_name": "AgentName1",
+             "last_name": "AgentSurname1", "provider_id": "c69f2d28-906a-3468-013b-6396e468a103"},
+    "lead": {"first_name": "John99", "last_name": "Doe99", "phone_mobile": "(083) 555-5599",
+             "campaign_code": "MWLItalkTestDefault", "lead_origin": "Our test website"},
+}
+
+
+def baseline_sign(access_key, secret_key, region, service, method, url, data, headers):
+    """The signing algorithm as it was before key caching."""
+    sign = lambda key, msg: hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()  # noqa: E731
+    parsed_url = urllib.parse.urlparse(url)
+    t = datetime.datetime.now(datetime.timezone.utc)
+    amz_date = t.strftime('%Y%m%dT%H%M%SZ')
+    date_stamp = t.strftime('%Y%m%d')
+    headers.update({'host': parsed_url.netloc, 'x-amz-date': amz_date})
+    canonical_headers = '\n'.join(f"{k.lower()}:{v.strip()}" for k, v in sorted(headers.items())) + '\n'
+    signed_headers = ';'.join(sorted(k.lower() for k in headers))
+    payload_hash = hashlib.sha256((data or '').encode('utf-8')).hexdigest()
+    canonical_request = '\n'.join([method, parsed_url.path or '/', parsed_url.query,
+                                   canonical_headers, signed_headers, payload_hash])
+    credential_scope = f"{date_stamp}/{region}/{service}/aws4_request"
+    string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, credential_scope,
+                                hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()])
+    k_signing = sign(sign(sign(sign(f'AWS4{secret_key}'.encode('utf-8'), date_stamp), region), service), 'aws4_request')
+    signature = hmac.new(k_signing, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    headers['Authorization'] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{credential_scope}, "
+                                f"SignedHeaders={signed_headers}, Signature={signature}")
+    return headers
+
+
+def measure(label, fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {iterations / elapsed:10.0f} signatures/s  ({elapsed / iterations * 1e6:6.2f} us each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    signer = AWSRequestSigner("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+    json_headers = {"Content-Type": "application/json", "Accept": "application/json"}
+
+    measure(
+        "before (dumps + uncached signing)",
+        lambda: baseline_sign(signer.access_key, signer.secret_key, signer.region, signer.service,
+                              "POST", URL, json.dumps(PAYLOAD), dict(json_headers)),
+        args.iterations,
+    )
+    measure(
+        "after (encode once + cached key)",
+        lambda: signer.sign_request("POST", URL, encode_payload(PAYLOAD), dict(json_headers)),
+        args.iterations,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark service cold start: import time and time to first request.
+
+Import time comes from `python -X importtime -c "import main"` in a fresh
+interpreter, with the slowest top-level packages listed by self time.
+Time to first request spawns uvicorn and polls until a request through
+the full lifespan succeeds. Each figure is the median of --runs fresh
+processes. Point --redis-host at an unreachable address to see what a
+missing Redis costs.
+
+Save a run with --output and compare later runs with --baseline; the
+script exits non-zero when either median regresses by more than
+--tolerance.
+
+    python scripts/bench_startup.py --runs 5 --output startup.json
+    python scripts/bench_startup.py --runs 5 --redis-host 10.255.255.1 --baseline startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx  # noqa: E402
+
+PROBE_PATH = "/api/v1/metrics/dtech"
+
+
+def import_times(env: dict) -> tuple[float, Counter]:
+    """Cumulative ms to import main, and self ms per top-level package"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=project_root, env=env, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    packages: Counter = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+        if name.strip() == "main":
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(env: dict, timeout: float) -> float:
+    """Ms from spawning uvicorn until a request through the app succeeds"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(PROBE_PATH).status_code == 200:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError(f"No response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results, baseline_path: Path, tolerance: float) -> bool:
+    baseline = json.loads(baseline_path.read_text())
+    ok = True
+    for metric in ("import_ms", "first_request_ms"):
+        before, after = baseline[metric], results[metric]
+        change = after / before - 1 if before else 0.0
+        flag = "REGRESSION" if change > tolerance else "ok"
+        ok = ok and flag == "ok"
+        print(f"{metric:<18} {before:8.1f}ms -> {after:8.1f}ms ({change:+.0%}) {flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--redis-host", help="Override REDIS_HOST for the spawned processes")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Give up on a server after this many seconds")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.redis_host:
+        env["REDIS_HOST"] = args.redis_host
+
+    imports, packages = [], Counter()
+    for _ in range(args.runs):
+        total, per_package = import_times(env)
+        imports.append(total)
+        packages.update(per_package)
+    first_requests = [time_to_first_request(env, args.timeout) for _ in range(args.runs)]
+
+    results = {
+        "import_ms": statistics.median(imports),
+        "first_request_ms": statistics.median(first_requests),
+    }
+    print(f"import main        {results['import_ms']:8.1f}ms (median of {args.runs})")
+    print(f"first request      {results['first_request_ms']:8.1f}ms (median of {args.runs})")
+    print("\nslowest packages by self import time:")
+    for name, total_ms in packages.most_common(args.top):
+        print(f"  {name:<24} {total_ms / args.runs:8.1f}ms")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark recording uploads: whole-file read versus streaming.
+
+Creates a synthetic WAV file, starts a local PUT sink that discards the
+body, and uploads the file with each strategy in a fresh subprocess so
+peak RSS is measured independently.
+
+    python scripts/bench_upload.py --size-mb 512
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+
+async def sink(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal HTTP/1.1 PUT target: read Content-Length bytes, reply 200."""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            while length:
+                length -= len(await reader.read(min(length, 1 << 20)))
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def run_child(mode: str, path: str, url: str):
+    from app.core.dtech_client import get_dtech_client, close_dtech_client, UPLOAD_OPERATION
+    from app.services.dtech_service import upload_recording_file
+    from app.utils.file_utils import calculate_file_md5
+
+    start = time.perf_counter()
+    if mode == "legacy":
+        # The previous implementation: separate 4 KB hashing pass + f.read()
+        md5_hash = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(4096), b""):
+                md5_hash.update(chunk)
+        with open(path, "rb") as f:
+            response = await get_dtech_client().request(UPLOAD_OPERATION, "PUT", url, content=f.read())
+            response.raise_for_status()
+    else:
+        recording_hash = calculate_file_md5(path)
+        await upload_recording_file(url, path, "audio/wav", recording_hash)
+    elapsed = time.perf_counter() - start
+    await close_dtech_client()
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(json.dumps({"mode": mode, "mb_per_s": size_mb / elapsed, "peak_rss_mb": peak_rss_mb()}))
+
+
+def write_wav(path: Path, size_mb: int):
+    data_size = size_mb * 1024 * 1024
+    header = (b"RIFF" + (36 + data_size).to_bytes(4, "little") + b"WAVEfmt "
+              + (16).to_bytes(4, "little") + (1).to_bytes(2, "little") + (1).to_bytes(2, "little")
+              + (8000).to_bytes(4, "little") + (16000).to_bytes(4, "little")
+              + (2).to_bytes(2, "little") + (16).to_bytes(2, "little")
+              + b"data" + data_size.to_bytes(4, "little"))
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        f.write(header)
+        for _ in range(size_mb):
+            f.write(block)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--child", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        await run_child(args.child, args.path, args.url)
+        return
+
+    server = await asyncio.start_server(sink, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/upload"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "recording.wav"
+        write_wav(path, args.size_mb)
+        async with server:
+            for mode in ("legacy", "streaming"):
+                proc = await asyncio.create_subprocess_exec(
+                    sys.executable, __file__, "--child", mode, "--path", str(path), "--url", url,
+                    stdout=subprocess.PIPE,
+                )
+                out, _ = await proc.communicate()
+                result = json.loads(out.decode().strip().splitlines()[-1])
+                print(f"{mode:<10} {result['mb_per_s']:8.1f} MB/s  peak RSS {result['peak_rss_mb']:8.1f} MB  "
+                      f"(file {args.size_mb} MB)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
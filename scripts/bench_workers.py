@@ -0,0 +1,163 @@
+"""
+Benchmark requests per second for one server worker versus several.
+
+Starts scripts/dtech_simulator.py, then for each worker count runs
+`run.py --prod --workers N` against it and drives the chosen endpoints
+from --clients load-generating processes (a single Python client tops out
+well before a multi-worker server does). Reports aggregate RPS, p50/p95
+and errors per worker count, plus the speed-up over the first count.
+
+    python scripts/bench_workers.py --workers 1,4 --clients 4 --requests 4000 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx  # noqa: E402
+
+from scripts.bench_sales_api import ACCOUNT_ID, LEAD, USER, percentile, scenarios  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with status {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.ReadTimeout:
+            # Accepting connections; the simulator just delays every response
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def stop(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def load(url: str, endpoint: str, spid: str, total: int, concurrency: int):
+    """Latencies and error count for ``total`` requests to one endpoint"""
+    method, path, kwargs = next((m, p, k) for n, m, p, k in scenarios(spid) if n == endpoint)
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **(kwargs() if callable(kwargs) else kwargs))
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(url, endpoint, spid, total, concurrency):
+    return asyncio.run(load(url, endpoint, spid, total, concurrency))
+
+
+def bench_server(args, workers: int, env: dict, pool: ProcessPoolExecutor):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "run.py", "--prod", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    rows = []
+    try:
+        wait_ready(f"{url}/api/v1/metrics/dtech", server)
+        response = httpx.post(f"{url}/api/v1/sales/start", json={"account_id": ACCOUNT_ID, "user": USER, "lead": LEAD})
+        response.raise_for_status()
+        spid = response.json()["sales_process_id"]
+
+        per_client = args.requests // args.clients
+        for endpoint in args.endpoints.split(","):
+            started = time.perf_counter()
+            results = list(pool.map(
+                client_process,
+                *zip(*[(url, endpoint, spid, per_client, args.concurrency)] * args.clients),
+            ))
+            elapsed = time.perf_counter() - started
+            latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+            rows.append({
+                "workers": workers,
+                "endpoint": endpoint,
+                "rps": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 0.50),
+                "p95_ms": percentile(latencies, 0.95),
+                "errors": sum(errors for _, errors in results),
+            })
+    finally:
+        stop(server)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="Comma-separated worker counts")
+    parser.add_argument("--endpoints", default="status,continue", help="Comma-separated endpoints to load")
+    parser.add_argument("--requests", type=int, default=4000, help="Requests per endpoint per worker count")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1, help="Load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Connections per client process")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated DTech latency in seconds")
+    args = parser.parse_args()
+
+    sim_port = free_port()
+    simulator = subprocess.Popen(
+        [sys.executable, "scripts/dtech_simulator.py", "--port", str(sim_port), "--latency", str(args.latency)],
+        cwd=project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    env = dict(os.environ, DIFFERENT_API_TEST=f"http://127.0.0.1:{sim_port}")
+    rows = []
+    try:
+        wait_ready(f"http://127.0.0.1:{sim_port}/_stats", simulator)
+        with ProcessPoolExecutor(max_workers=args.clients) as pool:
+            for workers in sorted({int(count) for count in args.workers.split(",")}):
+                rows.extend(bench_server(args, workers, env, pool))
+    finally:
+        stop(simulator)
+
+    baseline = {}
+    for row in rows:
+        base = baseline.setdefault(row["endpoint"], row["rps"])
+        print(
+            f"workers={row['workers']:<3} {row['endpoint']:<12} rps={row['rps']:8.0f} ({row['rps'] / base:4.1f}x)  "
+            f"p50={row['p50_ms']:7.2f}ms  p95={row['p95_ms']:7.2f}ms  errors={row['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
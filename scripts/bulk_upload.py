@@ -0,0 +1,233 @@
+"""
+Bulk-upload call recordings to DTech from a manifest.
+
+The manifest is CSV (with a header row) or JSONL with the fields
+``spid, account_id, date_start, date_end, path`` and optionally
+``content_type``, ``filename`` and ``external_ref``.
+
+Files are hashed in chunks by HashService (a process pool, backed by the
+HASH_CACHE_PATH cache), and a chunk's uploads start while the next chunk
+is hashed. Upload URLs are requested and files PUT with at most
+--concurrency uploads in flight. Every finished
+upload is appended to a checkpoint file, so re-running the same command
+after an interruption skips what already succeeded.
+
+    python scripts/bulk_upload.py manifest.csv --concurrency 8 --checkpoint backfill.ckpt
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import mimetypes
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Set
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+CONTENT_TYPES = {".wav": "audio/wav", ".mp3": "audio/mpeg"}
+# Files hashed per HashService.hash_files call
+HASH_CHUNK = 64
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    failures: int = 0
+
+    def record(self, size: int, seconds: float) -> None:
+        self.count += 1
+        self.bytes += size
+        self.seconds += seconds
+
+
+@dataclass
+class RunStats:
+    started: float = field(default_factory=time.perf_counter)
+    skipped: int = 0
+    hash_cache_hits: int = 0
+    hashing: StageStats = field(default_factory=StageStats)
+    upload_url: StageStats = field(default_factory=StageStats)
+    upload: StageStats = field(default_factory=StageStats)
+
+    def report(self) -> None:
+        wall = time.perf_counter() - self.started
+        print(f"\nFinished in {wall:.1f}s ({self.skipped} skipped from checkpoint, "
+              f"{self.hash_cache_hits} hashes from cache)")
+        for name, stage in (("hash", self.hashing), ("upload-url", self.upload_url), ("upload", self.upload)):
+            mb = stage.bytes / (1024 * 1024)
+            print(
+                f"  {name:<11} ok={stage.count:<6} failed={stage.failures:<5} "
+                f"{stage.count / wall:7.1f} files/s  {mb / wall:8.1f} MB/s  "
+                f"(avg {stage.seconds / stage.count if stage.count else 0:.3f}s per file)"
+            )
+
+
+def read_manifest(path: Path) -> Iterator[Dict[str, str]]:
+    with open(path, newline="") as f:
+        if path.suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def entry_key(entry: Dict[str, str]) -> str:
+    return f"{entry['spid']}:{entry['path']}"
+
+
+def load_checkpoint(path: Path) -> Set[str]:
+    done = set()
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["key"])
+                except (ValueError, KeyError):
+                    continue  # Tolerate a torn last line from a killed run
+    return done
+
+
+def hash_chunk(service, entries: List[Dict[str, str]], stats: RunStats) -> Dict[str, str]:
+    """Base64 MD5 per path for a chunk of entries; unreadable files are left out"""
+    paths = [entry["path"] for entry in entries]
+    hits = service.cache.hits if service.cache is not None else 0
+    start = time.perf_counter()
+    try:
+        hashes = service.hash_files(paths)
+    except OSError:
+        # One unreadable file fails the whole call; go file by file to isolate it
+        hashes = {}
+        for path in paths:
+            try:
+                hashes[path] = service.hash_file(path)
+            except OSError as e:
+                stats.hashing.failures += 1
+                logging.error("Hashing %s failed: %s", path, e)
+    seconds = (time.perf_counter() - start) / len(paths)
+    if service.cache is not None:
+        stats.hash_cache_hits += service.cache.hits - hits
+    for path in hashes:
+        stats.hashing.record(os.path.getsize(path), seconds)
+    return hashes
+
+
+async def upload_one(entry, recording_hash: str, semaphore, checkpoint, stats: RunStats) -> None:
+    from app.services.dtech_service import get_recording_url, upload_recording_file
+
+    path = entry["path"]
+    content_type = entry.get("content_type") or CONTENT_TYPES.get(
+        Path(path).suffix.lower(), mimetypes.guess_type(path)[0] or "audio/wav"
+    )
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            result = await get_recording_url(
+                spid=entry["spid"],
+                account_id=entry["account_id"],
+                date_start=entry["date_start"],
+                date_end=entry["date_end"],
+                recording_hash=recording_hash,
+                filename=entry.get("filename") or Path(path).name,
+                content_type=content_type,
+                external_ref=entry.get("external_ref") or None,
+            )
+        except Exception as e:
+            stats.upload_url.failures += 1
+            logging.error("Upload URL for %s failed: %s", path, e)
+            return
+        stats.upload_url.record(0, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        try:
+            await upload_recording_file(result["upload_url"], path, content_type, recording_hash)
+        except Exception as e:
+            stats.upload.failures += 1
+            logging.error("Upload of %s failed: %s", path, e)
+            return
+        stats.upload.record(os.path.getsize(path), time.perf_counter() - start)
+
+    checkpoint.write(json.dumps({"key": entry_key(entry), "recording_id": result.get("recording_id")}) + "\n")
+    checkpoint.flush()
+
+
+async def start_uploads(hash_service, chunk, semaphore, checkpoint, stats: RunStats, tasks: Set[asyncio.Task],
+                        max_pending: int) -> None:
+    """Hash a chunk off the event loop and start its uploads.
+
+    Waits first until fewer than ``max_pending`` uploads are outstanding, so
+    hashing stays only a little ahead of uploading and finished tasks are
+    not kept around for the whole manifest.
+    """
+    while len(tasks) >= max_pending:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    hashes = await asyncio.to_thread(hash_chunk, hash_service, chunk, stats)
+    for entry in chunk:
+        if entry["path"] in hashes:
+            task = asyncio.create_task(upload_one(entry, hashes[entry["path"]], semaphore, checkpoint, stats))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk-upload call recordings to DTech from a manifest")
+    parser.add_argument("manifest", type=Path, help="CSV or JSONL manifest")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max uploads in flight")
+    parser.add_argument("--hash-workers", type=int, default=os.cpu_count(), help="Hashing processes")
+    parser.add_argument("--checkpoint", type=Path, default=None,
+                        help="Checkpoint file (default: <manifest>.checkpoint)")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    from app.core.dtech_client import init_dtech_client, close_dtech_client
+    from app.utils.hashing import HashService, get_hash_service
+
+    checkpoint_path = args.checkpoint or args.manifest.with_suffix(args.manifest.suffix + ".checkpoint")
+    done = load_checkpoint(checkpoint_path)
+    stats = RunStats()
+
+    await init_dtech_client()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    max_pending = max(args.concurrency * 2, HASH_CHUNK)
+    try:
+        # One pool for the whole run rather than one per chunk
+        with ProcessPoolExecutor(max_workers=args.hash_workers) as executor, \
+                open(checkpoint_path, "a") as checkpoint:
+            hash_service = HashService(
+                cache=get_hash_service().cache, workers=args.hash_workers, executor=executor
+            )
+            tasks: Set[asyncio.Task] = set()
+            chunk = []
+            for entry in read_manifest(args.manifest):
+                if entry_key(entry) in done:
+                    stats.skipped += 1
+                    continue
+                chunk.append(entry)
+                if len(chunk) < HASH_CHUNK:
+                    continue
+                await start_uploads(hash_service, chunk, semaphore, checkpoint, stats, tasks, max_pending)
+                chunk = []
+            if chunk:
+                await start_uploads(hash_service, chunk, semaphore, checkpoint, stats, tasks, max_pending)
+            if tasks:
+                await asyncio.wait(tasks)
+    finally:
+        await close_dtech_client()
+        stats.report()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+"""
+Local DTech API simulator for load tests and benchmarks.
+
+Implements the endpoints this service calls (/ext/start, /ext/continue,
+/ext/status, /ext/stop, /recording-url) plus a presigned-style PUT target
+for recordings. Every response can be delayed and a fraction of requests
+can fail, so retry, breaker and timeout behaviour can be exercised
+without touching the real test gateway. With --verify, requests must
+carry a valid SigV4 signature for the configured AWS credentials.
+
+    python scripts/dtech_simulator.py --port 8081 --latency 0.05 --jitter 0.02 --error-rate 0.01 --verify
+
+Then point the service at it with DIFFERENT_API_TEST=http://127.0.0.1:8081.
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import hashlib
+import hmac
+import random
+import re
+import sys
+import uuid
+from pathlib import Path
+from typing import Optional
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.utils.aws_auth import AWSRequestSigner  # noqa: E402
+from config.settings import settings  # noqa: E402
+
+AUTHORIZATION_RE = re.compile(
+    r"AWS4-HMAC-SHA256 Credential=(?P<access_key>[^/]*)/(?P<date>\d{8})/(?P<region>[^/]+)/(?P<service>[^/]+)/aws4_request, "
+    r"SignedHeaders=(?P<signed_headers>[^,]+), Signature=(?P<signature>[0-9a-f]{64})"
+)
+
+STATUSES = ("created", "in_progress", "awaiting_customer", "completed")
+
+
+class Faults:
+    """Latency and error injection shared by every simulator endpoint"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, throttle_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+
+    async def apply(self) -> Optional[JSONResponse]:
+        """Sleep for the configured latency, then maybe return an injected error"""
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            return JSONResponse({"message": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
+        if roll < self.throttle_rate + self.error_rate:
+            return JSONResponse({"message": "Injected failure"}, status_code=self.error_status)
+        return None
+
+
+def verify_signature(signer: AWSRequestSigner, method: str, url: str, headers: dict, body: bytes) -> Optional[str]:
+    """Re-sign the request with the shared secret; return an error message on mismatch"""
+    match = AUTHORIZATION_RE.fullmatch(headers.get("authorization", ""))
+    if match is None:
+        return "Missing or malformed Authorization header"
+    if match["access_key"] != signer.access_key:
+        return "Unknown access key"
+    try:
+        timestamp = datetime.datetime.strptime(headers.get("x-amz-date", ""), "%Y%m%dT%H%M%SZ")
+    except ValueError:
+        return "Missing or malformed x-amz-date header"
+    # sign_request adds host and x-amz-date itself
+    signed = {
+        name: headers.get(name, "")
+        for name in match["signed_headers"].split(";")
+        if name not in ("host", "x-amz-date")
+    }
+    expected = signer.sign_request(method, url, body, signed, timestamp=timestamp)["Authorization"]
+    if not hmac.compare_digest(expected, headers["authorization"]):
+        return "Signature does not match"
+    return None
+
+
+def create_app(faults: Optional[Faults] = None, signer: Optional[AWSRequestSigner] = None) -> FastAPI:
+    """Build a simulator app; pass ``signer`` to require valid SigV4 signatures"""
+    faults = faults or Faults()
+    app = FastAPI(title="DTech simulator")
+    app.state.counts = {"requests": 0, "injected_errors": 0, "signature_failures": 0}
+    app.state.processes = {}
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next):
+        app.state.counts["requests"] += 1
+        if signer is not None and not request.url.path.startswith("/upload/"):
+            body = await request.body()
+            url = f"http://{request.headers.get('host', '')}{request.url.path}"
+            if request.url.query:
+                url += f"?{request.url.query}"
+            error = verify_signature(signer, request.method, url, dict(request.headers), body)
+            if error:
+                app.state.counts["signature_failures"] += 1
+                return JSONResponse({"message": error}, status_code=403)
+        injected = await faults.apply()
+        if injected is not None:
+            app.state.counts["injected_errors"] += 1
+            return injected
+        return await call_next(request)
+
+    def session_url(request: Request, spid: str) -> dict:
+        expiry = datetime.datetime.now() + datetime.timedelta(minutes=30)
+        return {
+            "url": f"{str(request.base_url).rstrip('/')}/dl/ext/start/{spid}/{uuid.uuid4()}",
+            "url_expiry": expiry.isoformat(),
+        }
+
+    @app.post("/ext/start")
+    async def start(request: Request):
+        payload = await request.json()
+        spid = str(uuid.uuid4())
+        app.state.processes[spid] = {"account_id": payload.get("account_id"), "status": "created"}
+        return {"sales_process_id": spid, **session_url(request, spid)}
+
+    @app.post("/ext/continue/{spid}")
+    async def continue_process(spid: str, request: Request):
+        await request.json()
+        process = app.state.processes.setdefault(spid, {"status": "created"})
+        process["status"] = "in_progress"
+        return {"sales_process_id": spid, **session_url(request, spid)}
+
+    @app.get("/ext/status/{spid}/{account_id}")
+    async def status(spid: str, account_id: str):
+        process = app.state.processes.get(spid)
+        state = process["status"] if process else faults.random.choice(STATUSES)
+        return {"sales_process_id": spid, "account_id": account_id, "status": state}
+
+    @app.post("/ext/stop/{spid}")
+    async def stop(spid: str, request: Request):
+        payload = await request.json()
+        app.state.processes.setdefault(spid, {})["status"] = "stopped"
+        return {"sales_process_id": spid, "status": "stopped", "reason": payload.get("reason")}
+
+    @app.post("/recording-url/{spid}")
+    async def recording_url(spid: str, request: Request):
+        await request.json()
+        recording_id = str(uuid.uuid4())
+        return {
+            "recording_id": recording_id,
+            "upload_url": f"{str(request.base_url).rstrip('/')}/upload/{recording_id}",
+        }
+
+    @app.put("/upload/{recording_id}")
+    async def upload(recording_id: str, request: Request):
+        md5 = hashlib.md5()
+        size = 0
+        async for chunk in request.stream():
+            md5.update(chunk)
+            size += len(chunk)
+        expected = request.headers.get("content-md5")
+        if expected and base64.b64encode(md5.digest()).decode() != expected:
+            return JSONResponse({"message": "Content-MD5 mismatch"}, status_code=400)
+        return {"recording_id": recording_id, "size": size}
+
+    @app.get("/_stats")
+    async def stats():
+        return app.state.counts
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--verify", action="store_true", help="Require SigV4 signatures for the configured AWS keys")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    signer = None
+    if args.verify:
+        signer = AWSRequestSigner(
+            access_key=settings.AWS_ACCESS_KEY_ID,
+            secret_key=settings.AWS_SECRET_ACCESS_KEY,
+            region=settings.AWS_REGION or "eu-west-1",
+            service=settings.AWS_SERVICE or "execute-api",
+        )
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.error_status, args.throttle_rate, args.seed)
+    uvicorn.run(create_app(faults, signer), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Load test: /status latency during a login storm.
+
+By default the app runs in-process with Appwrite and DTech replaced by
+fakes with fixed latency. The script measures /status latency at rest,
+then during a burst of concurrent logins, first through the async
+Appwrite facade and then with the SDK called inline on the event loop
+(the old behaviour). Pass --url to run the same storm against a live
+server instead; the inline comparison only exists in-process.
+
+    python scripts/load_login_storm.py --logins 300 --appwrite-latency 0.2
+"""
+import argparse
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx  # noqa: E402
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000  # noqa: E731
+    return f"n={len(samples):<5} p50={pick(0.5):7.1f}ms  p95={pick(0.95):7.1f}ms  p99={pick(0.99):7.1f}ms"
+
+
+async def sample_status(client, stop: asyncio.Event, interval: float):
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/v1/sales/status/spid-1/account-1")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def storm(client, logins: int, interval: float, duration: float):
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_status(client, stop, interval))
+    if logins:
+        await asyncio.gather(*(
+            client.post("/api/v1/sales/login", data={"email": f"agent{i}@example.com", "password": "secret"})
+            for i in range(logins)
+        ))
+    else:
+        await asyncio.sleep(duration)
+    stop.set()
+    return await sampler
+
+
+@asynccontextmanager
+async def in_process_app(appwrite_latency: float, inline: bool):
+    import main
+    from app.api.v1 import sales
+    from app.core.appwrite_async import appwrite
+    from app.services import status_cache
+
+    class FakeAccount:
+        def create_email_password_session(self, email, password):
+            time.sleep(appwrite_latency)  # The SDK blocks for a full round trip
+            return {"$id": email}
+
+    async def fake_status(spid, account_id):
+        await asyncio.sleep(0.005)
+        return {"status": "in_progress"}
+
+    status_cache.status_cache._fetch = fake_status
+    sales.validate_email = lambda email: None  # Skip the DNS deliverability lookup
+    status_cache.status_cache.ttl = 0
+    original = appwrite.create_email_password_session
+    if inline:
+        async def create_session(email, password):
+            return FakeAccount().create_email_password_session(email, password)
+    else:
+        async def create_session(email, password):
+            return await appwrite.run(FakeAccount().create_email_password_session, email, password)
+    appwrite.create_email_password_session = create_session
+    try:
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+                yield client
+    finally:
+        appwrite.create_email_password_session = original
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Run against a live server instead of in-process")
+    parser.add_argument("--logins", type=int, default=300)
+    parser.add_argument("--appwrite-latency", type=float, default=0.2)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between /status samples")
+    args = parser.parse_args()
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+            print("idle       ", percentiles(await storm(client, 0, args.interval, 2.0)))
+            print("login storm", percentiles(await storm(client, args.logins, args.interval, 0)))
+        return
+
+    async with in_process_app(args.appwrite_latency, inline=False) as client:
+        print("idle                 ", percentiles(await storm(client, 0, args.interval, 2.0)))
+        print("storm, async facade  ", percentiles(await storm(client, args.logins, args.interval, 0)))
+    async with in_process_app(args.appwrite_latency, inline=True) as client:
+        print("storm, inline SDK    ", percentiles(await storm(client, args.logins, args.interval, 0)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())